@@ -10,7 +10,8 @@ from api.models import (
     Amenity,
     CampsiteAmenity,
     Reservation,
-    Review
+    Review,
+    DailyOccupancy
 )
 
 admin.site.register(Camper)
@@ -21,3 +22,4 @@ admin.site.register(Amenity)
 admin.site.register(CampsiteAmenity)
 admin.site.register(Reservation)
 admin.site.register(Review)
+admin.site.register(DailyOccupancy)
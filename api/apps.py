@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class ApiConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "api"
+
+    def ready(self):
+        # Register signal handlers
+        from api import signals  # noqa: F401
+        from api.search import create_search_index
+
+        post_migrate.connect(create_search_index, sender=self)
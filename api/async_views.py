@@ -0,0 +1,173 @@
+"""Native async views for the hot read endpoints.
+
+Under ASGI (config/asgi.py) a synchronous DRF view ties up a thread for
+the whole request, including the time spent waiting on the database,
+the cache and slow clients. These plain Django async views serve the same
+payloads from the event loop instead:
+
+* ``GET async/campsites``: the campsite list, with the same filters,
+  fields/expand and cursor pagination as ``campsites``;
+* ``GET async/campsites/<pk>``: a single campsite;
+* ``GET async/campsites/<pk>/availability``: its day-by-day availability;
+* ``GET async/auth/profile``: the token holder's camper profile;
+* ``POST async/auth/login`` and ``POST async/auth/register``: sign in and
+  sign up, awaiting the password hashing pool (api/hashing.py) so a login
+  storm doesn't block the event loop.
+
+They share the ETags and payload cache of the sync views and use the async
+cache and ORM APIs. Cache hits never leave the event loop. Building a list
+page still goes through DRF's synchronous cursor paginator, so a list cache
+miss runs in a worker thread.
+"""
+
+import json
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate, alogin
+from django.db.models import aprefetch_related_objects
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from api import hashing
+from api.authentication import atoken_user
+from api.availability import aavailability_calendar, parse_calendar_range
+from api.cache import acached_response, acampsite_key, acatalog_key
+from api.filters import filter_campsites
+from api.models import Campsite
+from api.serializers import CamperProfileSerializer, CampsiteSerializer
+from api.views import CampsiteViewSet
+from api.views.auth_vewset import UsernameTaken, create_account
+
+
+def message(text, status):
+    """A JSON ``{"message": ...}`` response, as the sync views return."""
+    return JsonResponse({"message": text}, status=status)
+
+
+def error(text, status):
+    """A JSON ``{"error": ...}`` response, as the sync auth views return."""
+    return JsonResponse({"error": text}, status=status)
+
+
+def request_data(request):
+    """The JSON or form body of a POST. Raises ValueError on bad JSON."""
+    if request.content_type == "application/json":
+        return json.loads(request.body or b"{}")
+    return request.POST
+
+
+@require_safe
+async def campsite_list(request):
+    """
+    Async version of CampsiteViewSet.list.
+
+    Only the cache lookup is async. On a miss the page is built by DRF's
+    synchronous cursor paginator and serializers, so the queries, the
+    facet counts and the serialization all run in a worker thread through
+    sync_to_async.
+    """
+    try:
+        # Only builds the lazy queryset (search is a subquery), no queries
+        campsites = filter_campsites(Campsite.objects.all(), request.GET)
+    except ValueError as e:
+        return message(str(e), 400)
+
+    def build_page():
+        view = CampsiteViewSet()
+        return view.paginated_response(Request(request), campsites).data
+
+    async def build():
+        return await sync_to_async(build_page)()
+
+    return await acached_response(request, await acatalog_key(request), build)
+
+
+@require_safe
+async def campsite_detail(request, pk):
+    """Async version of CampsiteViewSet.retrieve."""
+
+    async def build():
+        campsite = await Campsite.objects.with_details().aget(pk=pk)
+        return CampsiteSerializer(campsite, context={"request": request}).data
+
+    try:
+        return await acached_response(request, await acampsite_key(request, pk), build)
+    except Campsite.DoesNotExist:
+        return message("Campsite not found", 404)
+
+
+@require_safe
+async def campsite_availability(request, pk):
+    """Async version of CampsiteViewSet.availability."""
+    if not await Campsite.objects.filter(pk=pk).aexists():
+        return JsonResponse({"detail": "No Campsite matches the given query."}, status=404)
+    today = date.today()
+    try:
+        start_date, end_date = parse_calendar_range(request.GET, today)
+    except ValueError as e:
+        return message(str(e), 400)
+
+    all_dates = await aavailability_calendar(pk, start_date, end_date, today)
+    return JsonResponse(all_dates, safe=False)
+
+
+@require_safe
+async def profile(request):
+    """Async version of CamperProfileViewSet.list."""
+    user = await atoken_user(request)
+    if user is None:
+        if "Authorization" in request.headers:
+            return JsonResponse({"detail": "Invalid token."}, status=401)
+        return message(
+            "Welcome, guest user! Please log in to access your profile.", 200
+        )
+
+    camper = getattr(user, "camper_profile", None)
+    if camper is None:
+        return message("No camper profile found.", 404)
+    await aprefetch_related_objects([camper], "payment_methods")
+    data = CamperProfileSerializer(camper, context={"request": request}).data
+    return JsonResponse(data)
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    """Async version of AuthViewSet.login."""
+    try:
+        data = request_data(request)
+    except ValueError:
+        return error("Invalid JSON body.", 400)
+    username = data.get("username")
+    password = data.get("password")
+    if not username or not password:
+        return error("Username and password are required.", 400)
+
+    user = await aauthenticate(request, username=username, password=password)
+    if user is None:
+        return error("Invalid credentials.", 401)
+
+    token, _ = await Token.objects.aget_or_create(user=user)
+    await alogin(request, user)
+    return JsonResponse({"valid": True, "token": token.key, "id": user.id})
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    """Async version of AuthViewSet.register."""
+    try:
+        data = request_data(request)
+    except ValueError:
+        return error("Invalid JSON body.", 400)
+
+    password = await hashing.amake_password(data["password"])
+    try:
+        new_user, token = await sync_to_async(create_account)(data, password)
+    except UsernameTaken:
+        return error("Username already exists", 400)
+    return JsonResponse({"token": token.key, "id": new_user.id}, status=201)
@@ -0,0 +1,219 @@
+"""Token authentication with cached token to (user, camper) resolution.
+
+DRF's TokenAuthentication joins authtoken_token to auth_user on every
+request, and most views then look the camper profile up separately.
+CachedTokenAuthentication resolves a token to its user and camper once,
+then serves repeat requests from a small in-process LRU backed by the
+shared Django cache. It attaches the profile as ``request.camper``.
+
+Cache entries are keyed by a hash of the token and hold only the fields
+in USER_CACHE_FIELDS and the camper profile, never the token itself or
+the password hash. Each request gets fresh instances rebuilt from them,
+with the user's other fields deferred.
+
+Entries are evicted by the signal handlers in api/signals.py when a token
+is deleted or its user or camper changes. Other processes' local LRUs
+can't be reached from there, so those entries only live for the short
+TOKEN_CACHE_LOCAL_TTL.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.models import Camper
+
+
+class LRUCache:
+    """A small thread-safe LRU mapping whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_token_cache = LRUCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_LOCAL_TTL
+)
+
+
+# User fields kept in the token cache; the rest load from the database on access
+USER_CACHE_FIELDS = [
+    "id",
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+]
+
+
+def token_cache_key(key):
+    """Cache key for a token's resolution."""
+    return "auth:token:v2:" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def token_entry(token):
+    """The cache entry for a token loaded with its user and camper profile."""
+    user = token.user
+    camper = getattr(user, "camper_profile", None)
+    return {
+        "created": token.created,
+        "user": {field: getattr(user, field) for field in USER_CACHE_FIELDS},
+        "camper": None
+        if camper is None
+        else {
+            field.attname: getattr(camper, field.attname)
+            for field in Camper._meta.concrete_fields
+        },
+    }
+
+
+def loaded_instance(model, values):
+    """An instance of ``model`` as if loaded with ``values``; other fields are deferred."""
+    names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+def entry_token(key, entry):
+    """Rebuild a token with its user and camper profile from a cache entry."""
+    user = loaded_instance(User, entry["user"])
+    if entry["camper"] is None:
+        # Cache the missing profile so checking for it doesn't query
+        User.camper_profile.related.set_cached_value(user, None)
+    else:
+        user.camper_profile = loaded_instance(Camper, entry["camper"])
+    token = loaded_instance(
+        Token, {"key": key, "user_id": user.pk, "created": entry["created"]}
+    )
+    token.user = user
+    return token
+
+
+def evict_tokens(*keys):
+    """Forget the cached resolution of the given token keys."""
+    cache_keys = [token_cache_key(key) for key in keys]
+    for cache_key in cache_keys:
+        local_token_cache.delete(cache_key)
+    cache.delete_many(cache_keys)
+
+
+def evict_user_tokens(user_id):
+    """Forget the cached resolution of every token belonging to a user."""
+    keys = Token.objects.filter(user_id=user_id).values_list("key", flat=True)
+    evict_tokens(*keys)
+
+
+def request_camper(request):
+    """The camper profile of the authenticated user, or None."""
+    if request.user.is_anonymous:
+        return None
+    if hasattr(request, "camper"):
+        return request.camper
+    return Camper.objects.filter(user=request.user).first()
+
+
+async def atoken_user(request):
+    """
+    The active user of a request's ``Authorization: Token <key>`` header,
+    or None. A counterpart of CachedTokenAuthentication for plain async
+    views, sharing its caches. The user comes with ``camper_profile``
+    already loaded.
+    """
+    scheme, _, key = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "token" or not key.strip():
+        return None
+    key = key.strip()
+
+    cache_key = token_cache_key(key)
+    entry = local_token_cache.get(cache_key)
+    if entry is None:
+        entry = await cache.aget(cache_key)
+        if entry is None:
+            try:
+                token = await Token.objects.select_related(
+                    "user__camper_profile"
+                ).aget(key=key)
+            except Token.DoesNotExist:
+                return None
+            entry = token_entry(token)
+            await cache.aset(cache_key, entry, timeout=settings.TOKEN_CACHE_TTL)
+        local_token_cache.set(cache_key, entry)
+    user = entry_token(key, entry).user
+    return user if user.is_active else None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that caches lookups and sets ``request.camper``."""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            # Loaded along with the user, so this doesn't query
+            request.camper = getattr(result[0], "camper_profile", None)
+        return result
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        entry = local_token_cache.get(cache_key)
+        if entry is None:
+            entry = cache.get(cache_key)
+            if entry is None:
+                entry = token_entry(self.resolve_token(key))
+                cache.set(cache_key, entry, timeout=settings.TOKEN_CACHE_TTL)
+            local_token_cache.set(cache_key, entry)
+
+        # Each request gets its own instances rather than sharing cached
+        # ones across threads
+        token = entry_token(key, entry)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return (token.user, token)
+
+    def resolve_token(self, key):
+        """Load a token with its user and camper profile in one query."""
+        try:
+            return Token.objects.select_related("user__camper_profile").get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
@@ -0,0 +1,163 @@
+"""Availability engine for campsites.
+
+Reservations are half-open night ranges: a stay from the 1st to the 3rd
+books the nights of the 1st and 2nd, leaving the 3rd free to check in.
+Booked ranges are merged once and then painted onto a per-day bitmap with
+slice assignment, so the cost grows with the number of reservations rather
+than with the number of nights they cover.
+"""
+
+import calendar
+from datetime import date, timedelta
+
+from django.db.models import Exists, OuterRef
+
+from api.models import Campsite, Reservation
+
+# Longest range a single availability request may cover.
+MAX_RANGE_DAYS = 366
+
+
+def parse_calendar_range(params, today):
+    """
+    The [start, end) dates of an availability request. Accepts either
+    ``month``/``year`` (defaulting to the current month) or an inclusive
+    ``start``/``end`` ISO date range. Raises ValueError on bad input.
+    """
+    try:
+        if "start" in params or "end" in params:
+            start_date = date.fromisoformat(params.get("start", ""))
+            end_date = date.fromisoformat(params.get("end", "")) + timedelta(days=1)
+        else:
+            month = int(params.get("month", today.month))
+            year = int(params.get("year", today.year))
+            start_date = date(year, month, 1)
+            _, days_in_month = calendar.monthrange(year, month)
+            end_date = start_date + timedelta(days=days_in_month)
+    except (ValueError, OverflowError):
+        raise ValueError(
+            "Invalid date range. Use start/end as YYYY-MM-DD or month/year"
+        )
+
+    if not 0 < (end_date - start_date).days <= MAX_RANGE_DAYS:
+        raise ValueError(f"Date range must cover 1 to {MAX_RANGE_DAYS} days")
+    return start_date, end_date
+
+
+def booked_ranges(campsite, start_date, end_date):
+    """(check_in, check_out) pairs of a campsite's stays within the range."""
+    return (
+        Reservation.objects.overlapping(start_date, end_date)
+        .filter(campsite=campsite)
+        .order_by("check_in_date")
+        .values_list("check_in_date", "check_out_date")
+    )
+
+
+def merge_intervals(ranges, start_date, end_date):
+    """
+    Clip sorted (check_in, check_out) pairs to [start_date, end_date) and
+    merge overlapping ones, as a sorted list of (start, end) tuples.
+    """
+    merged = []
+    for check_in, check_out in ranges:
+        check_in = max(check_in, start_date)
+        check_out = min(check_out, end_date)
+        if merged and check_in <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], check_out)
+        else:
+            merged.append([check_in, check_out])
+    return [(start, end) for start, end in merged]
+
+
+def booked_intervals(campsite, start_date, end_date):
+    """
+    Return the merged night ranges booked for a campsite within
+    [start_date, end_date), as a sorted list of (start, end) tuples.
+    """
+    return merge_intervals(
+        booked_ranges(campsite, start_date, end_date), start_date, end_date
+    )
+
+
+async def abooked_intervals(campsite, start_date, end_date):
+    """Async version of booked_intervals."""
+    # Iterated directly rather than with aiterator(), which runs values_list
+    # queries on the event loop
+    ranges = [pair async for pair in booked_ranges(campsite, start_date, end_date)]
+    return merge_intervals(ranges, start_date, end_date)
+
+
+def paint_bitmap(intervals, start_date, end_date, today):
+    """
+    Return a bytearray with one entry per day in [start_date, end_date):
+    1 when the night is free to book, 0 when it is booked or in the past.
+    """
+    days = (end_date - start_date).days
+    bitmap = bytearray(b"\x01") * days
+
+    past_days = min(max((today - start_date).days, 0), days)
+    bitmap[:past_days] = bytes(past_days)
+
+    for booked_start, booked_end in intervals:
+        first = (booked_start - start_date).days
+        last = (booked_end - start_date).days
+        bitmap[first:last] = bytes(last - first)
+    return bitmap
+
+
+def availability_bitmap(campsite, start_date, end_date, today):
+    """The availability bitmap of a campsite, see paint_bitmap."""
+    intervals = booked_intervals(campsite, start_date, end_date)
+    return paint_bitmap(intervals, start_date, end_date, today)
+
+
+def calendar_entries(bitmap, start_date):
+    """Return the per-day availability entries of a bitmap starting at start_date."""
+    day_names = calendar.day_name
+    month_names = calendar.month_name
+
+    all_dates = []
+    for offset, free in enumerate(bitmap):
+        current_date = start_date + timedelta(days=offset)
+        all_dates.append(
+            {
+                "date": current_date,
+                "day": day_names[current_date.weekday()],
+                "month": month_names[current_date.month],
+                "year": current_date.year,
+                "day_number": current_date.day,
+                "month_number": current_date.month,
+                "year_number": current_date.year,
+                "available": bool(free),
+            }
+        )
+    return all_dates
+
+
+def availability_calendar(campsite, start_date, end_date, today):
+    """Return the per-day availability entries for [start_date, end_date)."""
+    bitmap = availability_bitmap(campsite, start_date, end_date, today)
+    return calendar_entries(bitmap, start_date)
+
+
+async def aavailability_calendar(campsite, start_date, end_date, today):
+    """Async version of availability_calendar."""
+    intervals = await abooked_intervals(campsite, start_date, end_date)
+    bitmap = paint_bitmap(intervals, start_date, end_date, today)
+    return calendar_entries(bitmap, start_date)
+
+
+def available_campsites(check_in_date, check_out_date, guests):
+    """
+    Campsites that can host ``guests`` people for every night in
+    [check_in_date, check_out_date), resolved as a single anti-join.
+    """
+    booked = Reservation.objects.overlapping(check_in_date, check_out_date).filter(
+        campsite=OuterRef("pk")
+    )
+    return Campsite.objects.filter(
+        ~Exists(booked),
+        available=True,
+        max_occupancy__gte=guests,
+    )
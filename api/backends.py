@@ -0,0 +1,57 @@
+"""Authentication backend that hashes in the password hashing pool."""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from api import hashing
+
+UserModel = get_user_model()
+
+
+class HashingPoolBackend(ModelBackend):
+    """
+    ModelBackend whose password checks run in the hashing pool (see
+    api/hashing.py) instead of on the request thread or event loop, and
+    which upgrades outdated hashes on a successful login.
+
+    Unknown and inactive users still cost one hash, so neither can be told
+    apart from a wrong password by timing.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            hashing.make_password(password)
+            return None
+        if not hashing.check_password(password, user.password):
+            return None
+        if not self.user_can_authenticate(user):
+            return None
+        if hashing.needs_rehash(user.password):
+            user.password = hashing.make_password(password)
+            user.save(update_fields=["password"])
+        return user
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            await hashing.amake_password(password)
+            return None
+        if not await hashing.acheck_password(password, user.password):
+            return None
+        if not self.user_can_authenticate(user):
+            return None
+        if hashing.needs_rehash(user.password):
+            user.password = await hashing.amake_password(password)
+            await user.asave(update_fields=["password"])
+        return user
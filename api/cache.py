@@ -0,0 +1,170 @@
+"""Cache layer for serialized campsite payloads.
+
+Every payload is cached under a key derived from version tokens kept in
+the cache and the absolute request URL:
+
+* ``campsites:catalog`` changes whenever any campsite data changes and
+  covers list responses;
+* ``campsites:<pk>`` changes when that campsite or one of its images,
+  amenities or reviews changes and covers its detail response;
+* ``campsites:all`` changes on catalog-wide edits such as renaming an
+  amenity and covers every detail response.
+
+Bumping a token makes the old keys unreachable, so stale payloads are
+never served and simply expire. Signal handlers in api/signals.py do the
+bumping, once the transaction that changed the data has committed. The ETag is a hash of the payload itself, stored alongside it,
+so two processes only ever agree on an ETag when they hold the same data.
+Bumps only reach other processes through a shared cache backend (see
+CACHES in config/settings.py).
+"""
+
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = "campsites:catalog"
+GLOBAL_VERSION_KEY = "campsites:all"
+
+
+def campsite_version_key(pk):
+    """Cache key of the version token for a single campsite."""
+    return f"campsites:{pk}"
+
+
+def new_version():
+    """A fresh, unique version token."""
+    return uuid.uuid4().hex
+
+
+def get_versions(*keys):
+    """Read version tokens, creating any that are missing."""
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(*keys):
+    """Async version of get_versions."""
+    versions = await cache.aget_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def make_key(request, *versions):
+    """Cache key of the payload for a request URL at the given data versions."""
+    digest = hashlib.sha256(
+        "|".join([request.build_absolute_uri(), *versions]).encode()
+    ).hexdigest()
+    return f"campsites:payload:{digest[:32]}"
+
+
+def catalog_key(request):
+    """Payload cache key of a campsite list response."""
+    return make_key(request, *get_versions(CATALOG_VERSION_KEY))
+
+
+def campsite_key(request, pk):
+    """Payload cache key of a single campsite response."""
+    return make_key(
+        request, *get_versions(GLOBAL_VERSION_KEY, campsite_version_key(pk))
+    )
+
+
+async def acatalog_key(request):
+    """Async version of catalog_key."""
+    return make_key(request, *await aget_versions(CATALOG_VERSION_KEY))
+
+
+async def acampsite_key(request, pk):
+    """Async version of campsite_key."""
+    return make_key(
+        request, *await aget_versions(GLOBAL_VERSION_KEY, campsite_version_key(pk))
+    )
+
+
+def bump_versions(*keys):
+    """
+    Replace the version tokens ``keys`` once the current transaction
+    commits (at once outside one). Bumping earlier would let a request
+    that still sees the old rows cache them under the new version.
+    """
+
+    def bump():
+        cache.set_many({key: new_version() for key in keys}, timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_campsite(pk):
+    """Drop cached payloads for one campsite and for every list."""
+    bump_versions(CATALOG_VERSION_KEY, campsite_version_key(pk))
+
+
+def invalidate_catalog():
+    """Drop every cached campsite payload."""
+    bump_versions(CATALOG_VERSION_KEY, GLOBAL_VERSION_KEY)
+
+
+def client_has(request, etag):
+    """Whether the request's If-None-Match already covers ``etag``."""
+    client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+    return etag in client_etags or "*" in client_etags
+
+
+def payload_etag(data):
+    """Strong ETag of a serialized payload: a hash of its JSON form."""
+    digest = hashlib.sha256(
+        json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def cached_response(request, key, build):
+    """
+    Answer a GET from the payload cached under ``key``, calling
+    ``build()`` on a miss, or with a 304 when the client already holds it.
+    """
+    entry = cache.get(key)
+    if entry is None:
+        data = build()
+        entry = (payload_etag(data), data)
+        cache.set(key, entry, timeout=settings.CAMPSITE_CACHE_TIMEOUT)
+
+    etag, data = entry
+    headers = {"ETag": etag}
+    if client_has(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+
+async def acached_response(request, key, build):
+    """
+    Async version of cached_response for plain Django views: ``build`` is
+    a coroutine function and the result a JsonResponse.
+    """
+    entry = await cache.aget(key)
+    if entry is None:
+        data = await build()
+        entry = (payload_etag(data), data)
+        await cache.aset(key, entry, timeout=settings.CAMPSITE_CACHE_TIMEOUT)
+
+    etag, data = entry
+    headers = {"ETag": etag}
+    if client_has(request, etag):
+        return HttpResponseNotModified(headers=headers)
+    return JsonResponse(data, safe=False, headers=headers)
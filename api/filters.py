@@ -0,0 +1,210 @@
+"""Query parameter filters for the campsite catalog."""
+
+import math
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, F, FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+from api.models import CampsiteAmenity
+from api.search import search_campsites
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LATITUDE = 111.32
+DEFAULT_RADIUS_KM = 25
+# Largest primary key a 64-bit integer column holds
+MAX_ID = 2**63 - 1
+
+
+def decimal_param(params, name):
+    """Read a decimal query parameter, or None if absent."""
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        value = Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"{name} must be a number.")
+    if not value.is_finite():
+        raise ValueError(f"{name} must be a number.")
+    return value
+
+
+def int_list_param(params, name):
+    """Read a comma separated list of integers, or None if absent."""
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        ids = sorted({int(part) for part in value.split(",")})
+    except ValueError:
+        raise ValueError(f"{name} must be comma separated ids.")
+    if ids[0] < 1 or ids[-1] > MAX_ID:
+        raise ValueError(f"{name} must be comma separated ids.")
+    return ids
+
+
+def bool_param(params, name):
+    """Read a true/false query parameter, or None if absent."""
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise ValueError(f"{name} must be true or false.")
+
+
+def float_list_param(params, name, length):
+    """Read a comma separated list of ``length`` floats, or None if absent."""
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        numbers = [float(part) for part in value.split(",")]
+    except ValueError:
+        numbers = []
+    if len(numbers) != length or not all(math.isfinite(n) for n in numbers):
+        raise ValueError(f"{name} must be {length} comma separated numbers.")
+    return numbers
+
+
+def check_point(name, latitude, longitude):
+    """Raise ValueError unless (latitude, longitude) is on the globe."""
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError(
+            f"{name} latitudes must be within ±90 and longitudes within ±180."
+        )
+
+
+def longitude_between(west, east):
+    """
+    Filter for longitudes from ``west`` to ``east``, both within ±180. When
+    west > east the range crosses the antimeridian and wraps around.
+    """
+    if west <= east:
+        return Q(longitude__gte=west, longitude__lte=east)
+    return Q(longitude__gte=west) | Q(longitude__lte=east)
+
+
+def haversine_km(latitude, longitude):
+    """Database expression for the distance in km from a campsite to a point."""
+    lat = math.radians(latitude)
+    half_dlat = (Radians("latitude") - lat) / 2
+    half_dlng = (Radians("longitude") - math.radians(longitude)) / 2
+    a = Power(Sin(half_dlat), 2) + math.cos(lat) * Cos(Radians("latitude")) * Power(
+        Sin(half_dlng), 2
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a, output_field=FloatField()))
+
+
+def filter_near(campsites, latitude, longitude, radius_km):
+    """
+    Campsites within ``radius_km`` of a point, annotated with distance_km.
+    A bounding box on the indexed latitude/longitude columns narrows the
+    rows before the exact haversine distance is computed.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LATITUDE
+    cos_lat = math.cos(math.radians(latitude))
+    dlng = (
+        180
+        if cos_lat < 1e-6
+        else min(radius_km / (KM_PER_DEGREE_LATITUDE * cos_lat), 180)
+    )
+    campsites = campsites.filter(
+        latitude__gte=latitude - dlat, latitude__lte=latitude + dlat
+    )
+    if dlng < 180:
+        # Wrap a box reaching past ±180 round to the other side
+        west = (longitude - dlng + 540) % 360 - 180
+        east = (longitude + dlng + 540) % 360 - 180
+        campsites = campsites.filter(longitude_between(west, east))
+    return (
+        campsites.annotate(distance_km=haversine_km(latitude, longitude))
+        .filter(distance_km__lte=radius_km)
+    )
+
+
+def filter_campsites(campsites, params):
+    """
+    Apply the catalog filters in ``params`` to a campsite queryset.
+    Raises ValueError when a parameter is malformed.
+    """
+    query = params.get("q", "").strip()
+    if query:
+        campsites = search_campsites(campsites, query)
+
+    # Campsites offering every listed amenity
+    all_amenities = int_list_param(params, "amenities")
+    if all_amenities:
+        campsites = campsites.filter(
+            id__in=CampsiteAmenity.objects.filter(amenity_id__in=all_amenities)
+            .values("campsite")
+            .annotate(matched=Count("amenity"))
+            .filter(matched=len(all_amenities))
+            .values("campsite")
+        )
+
+    # Campsites offering at least one listed amenity
+    any_amenities = int_list_param(params, "amenities_any")
+    if any_amenities:
+        campsites = campsites.filter(
+            id__in=CampsiteAmenity.objects.filter(
+                amenity_id__in=any_amenities
+            ).values("campsite")
+        )
+
+    min_price = decimal_param(params, "min_price")
+    if min_price is not None:
+        campsites = campsites.filter(price_per_night__gte=min_price)
+    max_price = decimal_param(params, "max_price")
+    if max_price is not None:
+        campsites = campsites.filter(price_per_night__lte=max_price)
+
+    guests = decimal_param(params, "guests")
+    if guests is not None:
+        campsites = campsites.filter(max_occupancy__gte=guests)
+
+    available = bool_param(params, "available")
+    if available is not None:
+        campsites = campsites.filter(available=available)
+
+    min_rating = decimal_param(params, "min_rating")
+    if min_rating is not None:
+        campsites = campsites.filter(rating_avg__gte=min_rating)
+
+    # Map viewport as min_lng,min_lat,max_lng,max_lat. As in GeoJSON, a
+    # min_lng greater than max_lng crosses the antimeridian.
+    bbox = float_list_param(params, "bbox", 4)
+    if bbox is not None:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        check_point("bbox", min_lat, min_lng)
+        check_point("bbox", max_lat, max_lng)
+        if min_lat > max_lat:
+            raise ValueError("bbox min_lat must not be above max_lat.")
+        campsites = campsites.filter(
+            longitude_between(min_lng, max_lng),
+            latitude__gte=min_lat,
+            latitude__lte=max_lat,
+        )
+
+    near = float_list_param(params, "near", 2)
+    if near is not None:
+        check_point("near", near[0], near[1])
+        radius_km = decimal_param(params, "radius_km")
+        radius_km = DEFAULT_RADIUS_KM if radius_km is None else float(radius_km)
+        if radius_km <= 0:
+            raise ValueError("radius_km must be positive.")
+        campsites = filter_near(campsites, near[0], near[1], radius_km)
+    return campsites
+
+
+def amenity_facets(campsites):
+    """Number of matching campsites offering each amenity, in one grouped query."""
+    return list(
+        CampsiteAmenity.objects.filter(campsite__in=campsites.order_by().values("id"))
+        .values("amenity")
+        .annotate(name=F("amenity__name"), count=Count("campsite"))
+        .order_by("name")
+    )
@@ -0,0 +1,108 @@
+"""Password hashing off the request thread.
+
+Hashing a password with 1,000,000 PBKDF2 iterations burns about half a
+second of CPU. Running that on a web worker holds the GIL and starves every
+other request the worker is serving, so logins and registrations hand
+their hashing to a bounded process pool instead. At most
+PASSWORD_HASHING_WORKERS hashes run at once and callers beyond twice that
+wait their turn, which keeps a login storm from queueing unbounded work.
+Set PASSWORD_HASHING_WORKERS to 0 to hash inline.
+
+The async variants suit native async views under config/asgi.py: they
+wait for the pool without holding the event loop.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import hashers
+
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+
+
+class TunedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count taken from settings, so the
+    cost can be tuned per deployment. Stored hashes using a different
+    count are upgraded transparently the next time their owner logs in.
+    """
+
+    @property
+    def iterations(self):
+        # Read per hash, not at import, so overridden settings take effect
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+def _init_worker():
+    """Load Django settings in a freshly spawned pool process."""
+    import django
+
+    django.setup()
+
+
+def _get_pool():
+    """The shared hashing pool, started on first use."""
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is None:
+            workers = settings.PASSWORD_HASHING_WORKERS
+            # Spawn rather than fork: forking a threaded server is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            _pool_slots = threading.BoundedSemaphore(workers * 2)
+        return _pool, _pool_slots
+
+
+def _run(func, *args):
+    """Run func(*args) in the hashing pool, or inline if it is disabled."""
+    if settings.PASSWORD_HASHING_WORKERS <= 0:
+        return func(*args)
+    pool, slots = _get_pool()
+    with slots:
+        return pool.submit(func, *args).result()
+
+
+def _check_password(password, encoded):
+    return hashers.check_password(password, encoded)
+
+
+def check_password(password, encoded):
+    """Whether ``password`` matches the stored hash ``encoded``."""
+    return _run(_check_password, password, encoded)
+
+
+def make_password(password):
+    """Hash ``password`` with the preferred hasher."""
+    return _run(hashers.make_password, password)
+
+
+def make_passwords(passwords):
+    """Hash many passwords, spread across every worker in the pool."""
+    passwords = list(passwords)
+    if settings.PASSWORD_HASHING_WORKERS <= 0:
+        return [hashers.make_password(password) for password in passwords]
+    pool, _ = _get_pool()
+    chunksize = max(1, len(passwords) // (settings.PASSWORD_HASHING_WORKERS * 4))
+    return list(pool.map(hashers.make_password, passwords, chunksize=chunksize))
+
+
+def needs_rehash(encoded):
+    """Whether a stored hash should be upgraded to the current policy."""
+    preferred = hashers.get_hasher("default")
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        return False
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+
+
+acheck_password = sync_to_async(check_password, thread_sensitive=False)
+amake_password = sync_to_async(make_password, thread_sensitive=False)
@@ -0,0 +1,167 @@
+"""Downscaled variants of campsite images.
+
+Uploads are often multi-megabyte camera JPEGs, far larger than any client
+renders them. Every CampsiteImage gets a set of variants, each at most a
+given width and encoded as both WebP and JPEG, stored next to the original
+under ``campsite_images/variants/``. They are listed in the image's
+``variants`` field as::
+
+    {"thumb": {"width": 320, "height": 213, "source": "campsite_images/…",
+               "webp": "campsite_images/variants/…", "jpeg": "…"}, …}
+
+where ``source`` is the file they were rendered from. Image files are
+content-addressed (see api/storage.py), so images sharing a file share
+its variants too and they are only rendered once.
+
+Variants are generated when an image is saved (see api/signals.py) and
+can be backfilled with the ``generate_image_variants`` management command.
+Images without variants are served at their original size.
+"""
+
+import io
+
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+from api.models import CampsiteImage
+
+# Variant name to maximum width in pixels, smallest first
+VARIANT_WIDTHS = {"thumb": 320, "card": 800, "full": 1600}
+
+# Pillow format name and save options per stored encoding
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+VARIANT_DIRECTORY = "campsite_images/variants"
+
+
+def has_current_variants(image):
+    """Whether an image's variants were rendered from its current file."""
+    return bool(image.variants) and all(
+        variant.get("source") == image.image_url.name
+        for variant in image.variants.values()
+    )
+
+
+def shared_variants(image):
+    """Current variants of another image with the same file, if any."""
+    siblings = (
+        CampsiteImage.objects.filter(image_url=image.image_url.name)
+        .exclude(pk=image.pk)
+        .exclude(variants={})
+        .only("image_url", "variants")
+    )
+    for sibling in siblings:
+        if has_current_variants(sibling):
+            return sibling.variants
+    return None
+
+
+def generate_variants(image):
+    """
+    Render and store the variants of a CampsiteImage's current file.
+    Returns the new ``variants`` mapping; the caller saves it.
+    """
+    storage = image.image_url.storage
+    with image.image_url.open("rb") as source:
+        original = Image.open(source)
+        original.load()
+    original = ImageOps.exif_transpose(original).convert("RGB")
+
+    variants = {}
+    previous = None
+    for name, max_width in VARIANT_WIDTHS.items():
+        resized = original.copy()
+        # Never upscale: small originals keep their own size
+        resized.thumbnail((max_width, max_width * 10), Image.Resampling.LANCZOS)
+        if previous is not None and resized.size == (
+            previous["width"],
+            previous["height"],
+        ):
+            # Too small to differ from the previous variant: share its files
+            variants[name] = dict(previous)
+            continue
+        variant = {
+            "width": resized.width,
+            "height": resized.height,
+            "source": image.image_url.name,
+        }
+        for extension, (pillow_format, options) in VARIANT_FORMATS.items():
+            buffer = io.BytesIO()
+            resized.save(buffer, pillow_format, **options)
+            variant[extension] = storage.save(
+                f"{VARIANT_DIRECTORY}/{name}.{extension}",
+                ContentFile(buffer.getvalue()),
+            )
+        variants[name] = previous = variant
+    return variants
+
+
+def variant_names(variants):
+    """The stored file names in a ``variants`` mapping."""
+    return {
+        variant[extension]
+        for variant in (variants or {}).values()
+        for extension in VARIANT_FORMATS
+        if variant.get(extension)
+    }
+
+
+def referenced_names(names):
+    """The subset of ``names`` some CampsiteImage uses as file or variant."""
+    names = list(names)
+    query = Q(image_url__in=names)
+    for size in VARIANT_WIDTHS:
+        for extension in VARIANT_FORMATS:
+            query |= Q(**{f"variants__{size}__{extension}__in": names})
+    referenced = set()
+    for name, variants in CampsiteImage.objects.filter(query).values_list(
+        "image_url", "variants"
+    ):
+        referenced.add(name)
+        referenced.update(variant_names(variants))
+    return referenced.intersection(names)
+
+
+def release_image_files(name, variants):
+    """
+    Delete an image file and its variants, sparing those another
+    CampsiteImage still references (see ContentAddressedStorage.release).
+    Returns the deleted names.
+    """
+    storage = CampsiteImage._meta.get_field("image_url").storage
+    return storage.release([name, *variant_names(variants)], referenced_names)
+
+
+def variant_urls(image, request=None):
+    """
+    The variants of a CampsiteImage with storage names turned into URLs,
+    or an empty mapping when none have been generated.
+    """
+    storage = image.image_url.storage
+    urls = {}
+    for name, variant in (image.variants or {}).items():
+        urls[name] = {"width": variant["width"], "height": variant["height"]}
+        for extension in VARIANT_FORMATS:
+            if variant.get(extension):
+                url = storage.url(variant[extension])
+                urls[name][extension] = (
+                    request.build_absolute_uri(url) if request else url
+                )
+    return urls
+
+
+def srcset(urls, extension):
+    """
+    An HTML ``srcset`` string for one encoding of a variant_urls mapping.
+    Variants of a small original can share a width; each width is listed
+    once, as a srcset with repeated widths is invalid.
+    """
+    candidates = {}
+    for variant in urls.values():
+        if variant.get(extension):
+            candidates.setdefault(variant["width"], variant[extension])
+    return ", ".join(f"{url} {width}w" for width, url in candidates.items())
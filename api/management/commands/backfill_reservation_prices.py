@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Reservation
+
+
+class Command(BaseCommand):
+    """Fill in total_price for reservations saved without a price snapshot."""
+
+    help = "Backfill Reservation.total_price from the campsite's nightly rate."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of reservations updated per query.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        reservations = (
+            Reservation.objects.filter(total_price=0)
+            .select_related("campsite")
+            .only(
+                "id",
+                "check_in_date",
+                "check_out_date",
+                "total_price",
+                "campsite__price_per_night",
+            )
+        )
+
+        batch = []
+        updated = 0
+        for reservation in reservations.iterator(chunk_size=batch_size):
+            reservation.total_price = reservation.calculate_total_price()
+            batch.append(reservation)
+            if len(batch) >= batch_size:
+                updated += Reservation.objects.bulk_update(batch, ["total_price"])
+                batch = []
+        if batch:
+            updated += Reservation.objects.bulk_update(batch, ["total_price"])
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} reservations."))
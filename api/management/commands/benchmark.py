@@ -0,0 +1,184 @@
+import json
+import socket
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Measure an endpoint's throughput and latency under concurrent load."""
+
+    help = (
+        "Send concurrent HTTP requests to a running server and report "
+        "throughput and latency, e.g. "
+        "`benchmark http://localhost:8000/api/auth/login --data "
+        "'{\"username\": \"...\", \"password\": \"...\"}'`. "
+        "Several URLs are measured one after another, so the sync and async "
+        "views can be compared, e.g. against gunicorn and uvicorn: "
+        "`benchmark http://localhost:8000/api/campsites "
+        "http://localhost:8001/api/async/campsites --slow-clients 200`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", metavar="url", help="Absolute URL to request.")
+        parser.add_argument(
+            "--data",
+            help="JSON request body. Implies POST unless --method is given.",
+        )
+        parser.add_argument("--method", help="HTTP method (default GET).")
+        parser.add_argument(
+            "--header",
+            action="append",
+            default=[],
+            help="Extra 'Name: value' header. Repeatable.",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=100, help="Total requests to send."
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=10, help="Requests in flight at once."
+        )
+        parser.add_argument(
+            "--timeout", type=float, default=30.0, help="Per-request timeout in seconds."
+        )
+        parser.add_argument(
+            "--slow-clients",
+            type=int,
+            default=0,
+            help=(
+                "Extra clients that hold connections open for the whole run, "
+                "sending their request and reading the response slowly."
+            ),
+        )
+        parser.add_argument(
+            "--slow-delay",
+            type=float,
+            default=1.0,
+            help="Seconds a slow client waits between header lines and reads.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive.")
+
+        body = None
+        headers = {}
+        if options["data"] is not None:
+            try:
+                body = json.dumps(json.loads(options["data"])).encode()
+            except ValueError as error:
+                raise CommandError(f"--data is not valid JSON: {error}")
+            headers["Content-Type"] = "application/json"
+        for header in options["header"]:
+            name, _, value = header.partition(":")
+            headers[name.strip()] = value.strip()
+        method = options["method"] or ("POST" if body is not None else "GET")
+
+        for url in options["urls"]:
+            if len(options["urls"]) > 1:
+                self.stdout.write(self.style.MIGRATE_HEADING(url))
+            results, elapsed = self.run(url, method, body, headers, options)
+            self.report(results, elapsed)
+
+    def run(self, url, method, body, headers, options):
+        """Load one URL. Returns the (status, latency) results and elapsed time."""
+
+        def send(_):
+            request = urllib.request.Request(url, data=body, headers=headers, method=method)
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options["timeout"]) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as error:
+                status = error.code
+            except OSError:
+                status = None
+            return status, time.perf_counter() - started
+
+        stop = threading.Event()
+        slow_clients = [
+            threading.Thread(
+                target=self.slow_client,
+                args=(url, options["slow_delay"], options["timeout"], stop),
+                daemon=True,
+            )
+            for _ in range(options["slow_clients"])
+        ]
+        for client in slow_clients:
+            client.start()
+        if slow_clients:
+            # Let the slow clients take hold of their connections first
+            time.sleep(options["slow_delay"])
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(send, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        for client in slow_clients:
+            client.join()
+        return results, elapsed
+
+    def slow_client(self, url, delay, timeout, stop):
+        """
+        Repeatedly GET ``url``, trickling out one header line and reading
+        one small chunk per ``delay`` seconds, until ``stop`` is set.
+        """
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        lines = [
+            f"GET {path or '/'} HTTP/1.1",
+            f"Host: {parts.netloc}",
+            "User-Agent: benchmark-slow-client",
+            "Accept: */*",
+            "Connection: close",
+            "",
+        ]
+        while not stop.is_set():
+            try:
+                with socket.create_connection(
+                    (parts.hostname, parts.port or 80), timeout=timeout
+                ) as connection:
+                    for line in lines:
+                        connection.sendall(f"{line}\r\n".encode())
+                        if stop.wait(delay):
+                            return
+                    while connection.recv(512) and not stop.wait(delay):
+                        pass
+            except OSError:
+                stop.wait(delay)
+
+    def report(self, results, elapsed):
+        latencies = sorted(latency for _, latency in results)
+        statuses = {}
+        for status, _ in results:
+            label = str(status) if status is not None else "error"
+            statuses[label] = statuses.get(label, 0) + 1
+
+        def percentile(fraction):
+            index = min(len(latencies) - 1, int(fraction * len(latencies)))
+            return latencies[index] * 1000
+
+        self.stdout.write(f"Requests:    {len(results)} in {elapsed:.2f}s")
+        self.stdout.write(f"Throughput:  {len(results) / elapsed:.1f} req/s")
+        self.stdout.write(
+            f"Latency:     mean {statistics.mean(latencies) * 1000:.0f}ms, "
+            f"p50 {percentile(0.5):.0f}ms, p95 {percentile(0.95):.0f}ms, "
+            f"p99 {percentile(0.99):.0f}ms, max {latencies[-1] * 1000:.0f}ms"
+        )
+        self.stdout.write(
+            "Statuses:    "
+            + ", ".join(f"{label}: {count}" for label, count in sorted(statuses.items()))
+        )
+        if all(label.startswith("2") for label in statuses):
+            self.stdout.write(self.style.SUCCESS("All requests succeeded."))
+        else:
+            self.stdout.write(self.style.WARNING("Some requests failed."))
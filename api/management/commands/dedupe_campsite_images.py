@@ -0,0 +1,109 @@
+import posixpath
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.images import has_current_variants, referenced_names
+from api.models import CampsiteImage
+
+
+class Command(BaseCommand):
+    """Move campsite image files to content-addressed names, collapsing duplicates."""
+
+    help = (
+        "Rename every campsite image file after the SHA-256 of its content so "
+        "byte-identical copies collapse into one file, then delete the old "
+        "copies no image references anymore."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help=(
+                "Also delete files under the upload directory, variants "
+                "included, that no campsite image references."
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would change without touching files or rows.",
+        )
+
+    def handle(self, *args, **options):
+        field = CampsiteImage._meta.get_field("image_url")
+        storage = field.storage
+        dry_run = options["dry_run"]
+
+        moved = missing = 0
+        old_names = set()
+        images = CampsiteImage.objects.exclude(image_url="").order_by("pk")
+        for image in images.iterator():
+            old_name = image.image_url.name
+            if storage.is_content_name(old_name):
+                continue
+            if not storage.exists(old_name):
+                missing += 1
+                self.stderr.write(f"Image {image.pk}: {old_name} is missing.")
+                continue
+            moved += 1
+            if dry_run:
+                continue
+
+            with storage.open(old_name) as content:
+                new_name = storage.save(old_name, content)
+            old_names.add(old_name)
+            if has_current_variants(image):
+                # Same bytes, same variants: point them at the new name
+                # rather than rendering them again
+                for variant in image.variants.values():
+                    variant["source"] = new_name
+            image.image_url.name = new_name
+            with transaction.atomic():
+                # Signals release the old file once no image references it
+                # and drop cached payloads for the campsite
+                image.save(update_fields=["image_url", "variants"])
+
+        deleted = sum(not storage.exists(name) for name in old_names)
+
+        if options["prune"]:
+            deleted += self.prune(storage, field.upload_to, dry_run)
+
+        verb = "Would move" if dry_run else "Moved"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {moved} images to content-addressed files, "
+                f"deleted {deleted} unreferenced files."
+            )
+        )
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} image files are missing."))
+
+    def prune(self, storage, directory, dry_run):
+        """
+        Delete files under ``directory``, variants included, that no image
+        references and that weren't saved within the release grace period.
+        """
+        names = list(self.walk(storage, directory))
+        deleted = 0
+        # Batched so the reference lookup stays within query parameter limits
+        for start in range(0, len(names), 500):
+            batch = names[start : start + 500]
+            if dry_run:
+                for name in sorted(set(batch) - referenced_names(batch)):
+                    self.stdout.write(f"Would delete {name}")
+                    deleted += 1
+            else:
+                deleted += len(storage.release(batch, referenced_names))
+        return deleted
+
+    def walk(self, storage, directory):
+        """Every file name under ``directory``, recursively."""
+        if not storage.exists(directory):
+            return
+        directories, files = storage.listdir(directory)
+        for filename in files:
+            yield posixpath.join(directory, filename)
+        for subdirectory in directories:
+            yield from self.walk(storage, posixpath.join(directory, subdirectory))
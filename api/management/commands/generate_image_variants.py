@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from api.images import generate_variants, has_current_variants, shared_variants
+from api.models import CampsiteImage
+
+
+class Command(BaseCommand):
+    """Render downscaled variants for campsite images that lack them."""
+
+    help = (
+        "Generate thumb, card and full WebP/JPEG variants for campsite images "
+        "whose variants are missing or out of date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate variants for every image, even up-to-date ones.",
+        )
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        for image in CampsiteImage.objects.exclude(image_url="").iterator():
+            if not options["force"] and has_current_variants(image):
+                continue
+            try:
+                image.variants = (
+                    None if options["force"] else shared_variants(image)
+                ) or generate_variants(image)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f"Skipped image {image.pk} ({image.image_url.name}): {error}")
+                continue
+            image.save(update_fields=["variants"])
+            generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated variants for {generated} images.")
+        )
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} images could not be read."))
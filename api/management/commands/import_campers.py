@@ -0,0 +1,142 @@
+import csv
+import json
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from api import hashing
+from api.models import Camper
+
+FIELDS = ["username", "email", "password", "first_name", "last_name", "age", "phone_number"]
+
+
+class Command(BaseCommand):
+    """Bulk-register campers, e.g. for a partner's group booking."""
+
+    help = (
+        "Register campers in bulk from a CSV (with a header row) or JSON list "
+        f"file with the columns {', '.join(FIELDS)}. Only username is required. "
+        "Rows without a password get an unusable one. Usernames that already "
+        "exist are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON file of campers.")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows per INSERT."
+        )
+        parser.add_argument(
+            "--output",
+            help="Write username, id and API token of every new camper to this CSV.",
+        )
+
+    def handle(self, *args, **options):
+        rows = self.read_rows(Path(options["path"]))
+        batch_size = options["batch_size"]
+
+        # Drop usernames repeated in the file or already registered
+        by_username = {}
+        for number, row in enumerate(rows, start=1):
+            username = User.normalize_username((row.get("username") or "").strip())
+            if not username:
+                raise CommandError(f"Row {number} has no username.")
+            row["age"] = self.parse_age(row.get("age"), number)
+            by_username.setdefault(username, row)
+        usernames = list(by_username)
+        existing = set()
+        for start in range(0, len(usernames), batch_size):
+            existing.update(
+                User.objects.filter(
+                    username__in=usernames[start : start + batch_size]
+                ).values_list("username", flat=True)
+            )
+        new_rows = {
+            username: row
+            for username, row in by_username.items()
+            if username not in existing
+        }
+
+        # make_password(None) gives an unusable password
+        passwords = hashing.make_passwords(
+            row.get("password") or None for row in new_rows.values()
+        )
+        users = [
+            User(
+                username=username,
+                email=User.objects.normalize_email(row.get("email") or ""),
+                password=password,
+                first_name=row.get("first_name") or "",
+                last_name=row.get("last_name") or "",
+            )
+            for (username, row), password in zip(new_rows.items(), passwords)
+        ]
+
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+            if users and users[0].pk is None:
+                # Backends that can't return inserted keys
+                ids = dict(
+                    User.objects.filter(username__in=new_rows).values_list(
+                        "username", "id"
+                    )
+                )
+                for user in users:
+                    user.pk = ids[user.username]
+            Camper.objects.bulk_create(
+                [
+                    Camper(
+                        user=user,
+                        age=new_rows[user.username]["age"],
+                        phone_number=new_rows[user.username].get("phone_number") or None,
+                    )
+                    for user in users
+                ],
+                batch_size=batch_size,
+            )
+            tokens = Token.objects.bulk_create(
+                [Token(key=Token.generate_key(), user=user) for user in users],
+                batch_size=batch_size,
+            )
+
+        if options["output"]:
+            with open(options["output"], "w", newline="") as output:
+                writer = csv.writer(output)
+                writer.writerow(["username", "id", "token"])
+                for user, token in zip(users, tokens):
+                    writer.writerow([user.username, user.pk, token.key])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Registered {len(users)} campers, "
+                f"skipped {len(rows) - len(users)} duplicate or existing usernames."
+            )
+        )
+
+    def parse_age(self, value, number):
+        """Return row ``number``'s age as an int, or None when it's blank."""
+        if value is None or str(value).strip() == "":
+            return None
+        try:
+            age = int(str(value).strip())
+        except ValueError:
+            raise CommandError(f"Row {number} has a non-numeric age: {value!r}.")
+        if age < 0:
+            raise CommandError(f"Row {number} has a negative age: {value!r}.")
+        return age
+
+    def read_rows(self, path):
+        """Load the rows of a CSV or JSON file as dicts."""
+        try:
+            with path.open(newline="") as source:
+                if path.suffix.lower() == ".json":
+                    rows = json.load(source)
+                else:
+                    rows = list(csv.DictReader(source))
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Can't read {path}: {error}")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise CommandError(f"{path} must hold a list of camper records.")
+        return rows
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import invalidate_catalog
+from api.models import Campsite
+from api.models.campsite import parse_coordinates
+
+
+class Command(BaseCommand):
+    """Fill latitude/longitude from the free-text coordinates column."""
+
+    help = "Parse Campsite.coordinates strings into latitude and longitude."
+
+    def handle(self, *args, **options):
+        campsites = list(Campsite.objects.only("id", "coordinates"))
+        unparsed = 0
+        for campsite in campsites:
+            campsite.latitude, campsite.longitude = parse_coordinates(
+                campsite.coordinates
+            )
+            if campsite.latitude is None:
+                unparsed += 1
+                self.stderr.write(
+                    f"Campsite {campsite.pk}: can't parse {campsite.coordinates!r}"
+                )
+        Campsite.objects.bulk_update(
+            campsites, ["latitude", "longitude"], batch_size=500
+        )
+        # bulk_update sends no signals, so drop cached payloads here
+        invalidate_catalog()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Parsed coordinates for {len(campsites) - unparsed} of "
+                f"{len(campsites)} campsites."
+            )
+        )
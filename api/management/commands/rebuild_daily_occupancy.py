@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.models import DailyOccupancy
+
+
+class Command(BaseCommand):
+    """Recompute the DailyOccupancy rollup from scratch."""
+
+    help = "Rebuild the daily occupancy rollup from all reservations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rollup rows inserted per query.",
+        )
+
+    def handle(self, *args, **options):
+        created = DailyOccupancy.objects.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} occupancy rows."))
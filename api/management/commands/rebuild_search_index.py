@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.search import create_search_index, rebuild_search_index
+
+
+class Command(BaseCommand):
+    """Rebuild the full-text search index for campsites."""
+
+    help = "Rebuild the campsite full-text search index from scratch."
+
+    def handle(self, *args, **options):
+        create_search_index()
+        indexed = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} campsites."))
@@ -0,0 +1,38 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from api.cache import invalidate_catalog
+from api.models import Campsite, Review
+
+
+class Command(BaseCommand):
+    """Recompute the denormalized review aggregates on every campsite."""
+
+    help = "Refresh Campsite rating_avg, rating_count and rating_histogram."
+
+    def handle(self, *args, **options):
+        histograms = defaultdict(dict)
+        counts = (
+            Review.objects.order_by()
+            .values("campground", "rating")
+            .annotate(count=Count("id"))
+        )
+        for row in counts:
+            histograms[row["campground"]][row["rating"]] = row["count"]
+
+        campsites = list(Campsite.objects.only("id"))
+        for campsite in campsites:
+            campsite.set_rating_aggregates(histograms[campsite.pk])
+        Campsite.objects.bulk_update(
+            campsites,
+            ["rating_avg", "rating_count", "rating_histogram"],
+            batch_size=500,
+        )
+        # bulk_update sends no signals, so drop cached payloads here
+        invalidate_catalog()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed ratings for {len(campsites)} campsites.")
+        )
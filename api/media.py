@@ -0,0 +1,173 @@
+"""Media file delivery for production.
+
+``serve_media`` replaces ``django.conf.urls.static``, which only runs with
+DEBUG on and sends no caching headers. For each file under MEDIA_ROOT it:
+
+* sends ``Cache-Control: immutable`` with a one-year max-age for
+  content-addressed files (see api/storage.py), whose URL changes whenever
+  their content does. Other files get MEDIA_CACHE_MAX_AGE;
+* sends a strong ETag (the content hash where there is one) and answers
+  If-None-Match / If-Modified-Since with 304;
+* answers a single ``Range: bytes=…`` request with 206, honouring If-Range;
+* hands the bytes to the proxy with X-Accel-Redirect or X-Sendfile when
+  MEDIA_OFFLOAD is set, and otherwise streams them with FileResponse.
+  Under a server that provides ``wsgi.file_wrapper`` with sendfile
+  (gunicorn, uWSGI), that is a zero-copy ``os.sendfile``.
+"""
+
+import mimetypes
+import os
+import posixpath
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+from django.views.decorators.http import require_safe
+
+from api.storage import campsite_image_storage
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FileRange:
+    """
+    File-like view of the next ``length`` bytes of an open file.
+
+    Exposes ``fileno()`` so a sendfile-capable ``wsgi.file_wrapper`` can
+    still send it zero-copy. Those send from the current offset and stop at
+    Content-Length.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def media_etag(path, stats):
+    """Strong ETag for a media file: its content hash, or size and mtime."""
+    if campsite_image_storage.is_content_name(path):
+        return '"%s"' % posixpath.splitext(posixpath.basename(path))[0]
+    return f'"{stats.st_size:x}-{stats.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """
+    The (start, end) byte positions, end inclusive, of a single-range
+    Range header. Returns None to serve the whole file. Raises ValueError
+    when the range can't be satisfied.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        # Multiple or malformed ranges: ignoring the header is allowed
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve a file from MEDIA_ROOT with caching, conditional and range support."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(full_path)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404("Media file not found.")
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404("Media file not found.")
+
+    etag = media_etag(path, stats)
+    last_modified = int(stats.st_mtime)
+    cache_control = (
+        IMMUTABLE_CACHE_CONTROL
+        if campsite_image_storage.is_content_name(path)
+        else f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+    )
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified[header] = value
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    if settings.MEDIA_OFFLOAD:
+        # The proxy sends the bytes and handles Range itself
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if settings.MEDIA_OFFLOAD == "x-accel-redirect":
+            # nginx percent-decodes the URI, so spaces, % and non-ASCII
+            # characters in file names must arrive quoted
+            response["X-Accel-Redirect"] = settings.MEDIA_OFFLOAD_PREFIX + quote(path)
+        else:
+            response["X-Sendfile"] = full_path
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    # A Range is only honoured while the client's copy is still current
+    if range_header and (not if_range or etag in parse_etags(if_range)):
+        try:
+            byte_range = parse_range(range_header, stats.st_size)
+        except ValueError:
+            response = HttpResponse(status=416, headers=headers)
+            response["Content-Range"] = f"bytes */{stats.st_size}"
+            return response
+
+    file = open(full_path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type, headers=headers)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(
+            FileRange(file, end - start + 1),
+            status=206,
+            content_type=content_type,
+            headers=headers,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{stats.st_size}"
+        response["Content-Length"] = end - start + 1
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
@@ -3,3 +3,4 @@ from .campsite import Campsite, CampsiteImage
 from .amenities import Amenity,CampsiteAmenity
 from .reservation import Reservation
 from .review import Review
+from .occupancy import DailyOccupancy
@@ -31,6 +31,10 @@ class CampsiteAmenity(models.Model):
         verbose_name_plural = "Campsite Amenities"
         ordering = ["campsite", "amenity"]
         unique_together = ("campsite", "amenity")
+        indexes = [
+            # Covers amenity filters and facet counts
+            models.Index(fields=["amenity", "campsite"], name="campsite_amenity_lookup_idx"),
+        ]
 
     def __str__(self):
         return f"{self.campsite} - {self.amenity}"
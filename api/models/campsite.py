@@ -1,6 +1,10 @@
-from django.db.models import Model
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Count, Model
 from django.core.validators import FileExtensionValidator
-from django.contrib.gis.db import models
+
+from api.storage import campsite_image_storage
 
 
 class CampsiteImage(Model):
@@ -9,20 +13,111 @@ class CampsiteImage(Model):
     )
     image_url = models.ImageField(
         upload_to="campsite_images",
+        storage=campsite_image_storage,
         validators=[FileExtensionValidator(allowed_extensions=["jpg", "jpeg", "png"])],
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Downscaled renditions of the upload, see api/images.py
+    variants = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        # Oldest first, so a campsite's first image (its thumbnail) is stable
+        ordering = ["uploaded_at", "id"]
+
+
+def parse_coordinates(coordinates):
+    """
+    Parse a "lat,lng" string into a (latitude, longitude) tuple of floats,
+    or (None, None) when it isn't a valid coordinate pair.
+    """
+    try:
+        latitude, longitude = (float(part) for part in coordinates.split(","))
+    except (AttributeError, ValueError):
+        return None, None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None, None
+    return latitude, longitude
+
+
+def empty_rating_histogram():
+    """Review counts keyed by star rating, all zero."""
+    return {str(stars): 0 for stars in range(1, 6)}
+
+
+class CampsiteQuerySet(models.QuerySet):
+    """QuerySet helpers for loading campsites along with their relations."""
+
+    def with_details(self, amenities=True, reviews=True):
+        """
+        Prefetch everything CampsiteSerializer reads so a listing runs in a
+        fixed number of queries regardless of how many campsites there are.
+        Relations the caller is not going to render can be switched off.
+        """
+        lookups = ["images"]
+        if amenities:
+            lookups.append("amenities__amenity")
+        if reviews:
+            lookups.append("reviews__camper__user")
+        return self.prefetch_related(*lookups)
 
 
 class Campsite(Model):
     site_number = models.CharField(max_length=255)
     description = models.TextField()
     coordinates = models.CharField()
-    price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
+    # Numeric copy of coordinates, parsed on save for geographic queries
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    price_per_night = models.DecimalField(max_digits=10, decimal_places=2, db_index=True)
     max_occupancy = models.IntegerField()
     available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Review aggregates, kept up to date by Review signals
+    rating_avg = models.DecimalField(
+        max_digits=3, decimal_places=2, default=Decimal("0.00"), db_index=True
+    )
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_histogram = models.JSONField(default=empty_rating_histogram)
+
+    objects = CampsiteQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Bounding box prefilter for radius and map searches
+            models.Index(fields=["latitude", "longitude"], name="campsite_location_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.latitude, self.longitude = parse_coordinates(self.coordinates)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "coordinates" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "latitude", "longitude"}
+        super().save(*args, **kwargs)
+
+    def set_rating_aggregates(self, histogram):
+        """Set the review aggregates from a {stars: count} histogram."""
+        self.rating_histogram = empty_rating_histogram()
+        for stars, count in histogram.items():
+            self.rating_histogram[str(stars)] = count
+        self.rating_count = sum(self.rating_histogram.values())
+        total = sum(int(stars) * count for stars, count in self.rating_histogram.items())
+        self.rating_avg = (
+            round(Decimal(total) / self.rating_count, 2)
+            if self.rating_count
+            else Decimal("0.00")
+        )
+
+    def refresh_rating_aggregates(self):
+        """Recompute the review aggregates from this campsite's reviews."""
+        histogram = dict(
+            self.reviews.order_by()
+            .values("rating")
+            .annotate(count=Count("id"))
+            .values_list("rating", "count")
+        )
+        self.set_rating_aggregates(histogram)
+        self.save(update_fields=["rating_avg", "rating_count", "rating_histogram"])
 
     def __str__(self):
         return self.site_number
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import models, transaction
+
+from .campsite import Campsite
+from .reservation import Reservation
+
+
+class DailyOccupancyQuerySet(models.QuerySet):
+    """Helpers for keeping the occupancy rollup in step with reservations."""
+
+    def nights_for(self, reservation):
+        """Build (unsaved) rollup rows for every night of a reservation."""
+        nights = (reservation.check_out_date - reservation.check_in_date).days
+        if nights <= 0 or reservation.status == "cancelled":
+            return []
+
+        # Split the price evenly, putting any rounding remainder on the
+        # first night so the rollup always sums back to total_price.
+        total = Decimal(reservation.total_price or 0)
+        nightly = (total / nights).quantize(Decimal("0.01"), rounding=ROUND_DOWN)
+        first_night = total - nightly * (nights - 1)
+        return [
+            self.model(
+                campsite_id=reservation.campsite_id,
+                reservation_id=reservation.pk,
+                date=reservation.check_in_date + timedelta(days=offset),
+                booked=True,
+                revenue=first_night if offset == 0 else nightly,
+            )
+            for offset in range(nights)
+        ]
+
+    def refresh_for(self, reservation):
+        """Replace the rollup rows of a single reservation."""
+        with transaction.atomic():
+            self.filter(reservation=reservation).delete()
+            self.bulk_create(self.nights_for(reservation))
+
+    def rebuild(self, batch_size=1000):
+        """Recompute the whole rollup from the reservation table."""
+        created = 0
+        with transaction.atomic():
+            self.all().delete()
+            batch = []
+            reservations = Reservation.objects.active().only(
+                "id",
+                "campsite_id",
+                "check_in_date",
+                "check_out_date",
+                "status",
+                "total_price",
+            )
+            for reservation in reservations.iterator(chunk_size=batch_size):
+                batch.extend(self.nights_for(reservation))
+                if len(batch) >= batch_size:
+                    created += len(self.bulk_create(batch))
+                    batch = []
+            if batch:
+                created += len(self.bulk_create(batch))
+        return created
+
+
+class DailyOccupancy(models.Model):
+    """
+    Pre-aggregated rollup with one row per booked campsite night.
+
+    Rows are maintained from Reservation signals (see api/signals.py) and
+    can be rebuilt with the ``rebuild_daily_occupancy`` management command.
+    Rows are unique per reservation night rather than per campsite night,
+    so a reservation that overlaps another (e.g. one made in the admin)
+    still has all of its nights and revenue in the rollup.
+    """
+
+    campsite = models.ForeignKey(
+        Campsite, on_delete=models.CASCADE, related_name="daily_occupancy"
+    )
+    reservation = models.ForeignKey(
+        Reservation, on_delete=models.CASCADE, related_name="nights"
+    )
+    date = models.DateField()
+    booked = models.BooleanField(default=True)
+    revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+
+    objects = DailyOccupancyQuerySet.as_manager()
+
+    class Meta:
+        db_table = "daily_occupancy"
+        verbose_name = "Daily Occupancy"
+        verbose_name_plural = "Daily Occupancy"
+        ordering = ["date", "campsite"]
+        unique_together = ("reservation", "date")
+        indexes = [
+            models.Index(fields=["date", "campsite"], name="daily_occupancy_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.campsite} - {self.date}"
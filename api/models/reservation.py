@@ -5,6 +5,24 @@ from api.models import Camper
 from api.models import Campsite
 
 
+class ReservationQuerySet(models.QuerySet):
+    """QuerySet helpers for reservation date lookups."""
+
+    def active(self):
+        """Reservations that still hold their nights (not cancelled)."""
+        return self.exclude(status="cancelled")
+
+    def overlapping(self, start_date, end_date):
+        """
+        Active reservations booking any night in [start_date, end_date).
+        Stays are half-open: the check-out day is free for the next guest.
+        """
+        return self.active().filter(
+            check_in_date__lt=end_date,
+            check_out_date__gt=start_date,
+        )
+
+
 class Reservation(models.Model):
     """
     Model representing a reservation made by a camper at a campground.
@@ -14,6 +32,19 @@ class Reservation(models.Model):
         verbose_name = "Reservation"
         verbose_name_plural = "Reservations"
         ordering = ["check_in_date"]  # Order by check-in date
+        indexes = [
+            # Covers availability lookups for a single campsite
+            models.Index(
+                fields=["campsite", "check_in_date", "check_out_date", "status"],
+                name="reservation_availability_idx",
+            ),
+            # Covers date-range filters in the admin reports
+            models.Index(fields=["check_in_date"], name="reservation_check_in_idx"),
+            # Covers a camper's paginated reservation history
+            models.Index(
+                fields=["camper", "check_in_date"], name="reservation_camper_idx"
+            ),
+        ]
 
     # Define the fields for the Reservation model
     # Foreign key to the Camper model
@@ -30,7 +61,7 @@ class Reservation(models.Model):
     check_out_date = models.DateField()
     # Number of guests
     number_of_guests = models.PositiveIntegerField()
-    # Created at timestamp
+    # Price snapshot taken when the reservation is booked
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     status = models.CharField(
         max_length=20,
@@ -42,16 +73,25 @@ class Reservation(models.Model):
         ],
         default="pending",
     )
+    # Created at timestamp
     created_at = models.DateTimeField(auto_now_add=True)
     # Updated at timestamp
     updated_at = models.DateTimeField(auto_now=True)
 
-    @property
-    def total_price(self):
-        """gets total price of reservation"""
+    objects = ReservationQuerySet.as_manager()
+
+    def calculate_total_price(self):
+        """Price of the stay at the campsite's current nightly rate."""
         stay_duration = (self.check_out_date - self.check_in_date).days
         price_per_night = self.campsite.price_per_night
-        return round(stay_duration * price_per_night,2)
+        return round(stay_duration * price_per_night, 2)
+
+    def save(self, *args, **kwargs):
+        # Snapshot the price at booking time so later rate changes don't
+        # rewrite history and revenue can be summed in the database.
+        if self._state.adding and not self.total_price:
+            self.total_price = self.calculate_total_price()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Reservation  {self.check_in_date} to {self.check_out_date}"
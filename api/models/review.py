@@ -17,5 +17,13 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Covers paging through a campsite's reviews by date
+            models.Index(
+                fields=["campground", "created_at"], name="review_campground_created_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"Review by {self.camper.user.username} for {self.campground.site_number} - {self.rating} Stars"
@@ -0,0 +1,38 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CampsiteCursorPagination(CursorPagination):
+    """Keyset pagination for the campsite catalog."""
+
+    ordering = "id"
+    page_size = 25
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        # Text searches come back best match first and radius searches
+        # nearest first, unless an ordering is asked for
+        if "ordering" not in request.query_params:
+            if "search_rank" in queryset.query.annotations:
+                return ("-search_rank",)
+            if "distance_km" in queryset.query.annotations:
+                return ("distance_km",)
+        return super().get_ordering(request, queryset, view)
+
+
+class ReservationCursorPagination(CursorPagination):
+    """Keyset pagination for reservation listings, most recent stay first."""
+
+    ordering = "-check_in_date"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class ReviewCursorPagination(CursorPagination):
+    """Keyset pagination for a campsite's reviews, newest first."""
+
+    ordering = ("-created_at", "-id")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
@@ -0,0 +1,289 @@
+"""Full-text search over campsite descriptions and review comments.
+
+Every campsite has one search document built from its description and its
+reviews' comments, held in an inverted index outside the ORM:
+
+* SQLite: an FTS5 virtual table, ranked with bm25();
+* PostgreSQL: a tsvector column with a GIN index, ranked with ts_rank().
+
+The index is created after migrations run, kept in sync by the signal
+handlers in api/signals.py once each transaction commits (new reviews are
+appended, anything else reindexes the campsite once) and can be rebuilt
+with the ``rebuild_search_index`` management command. Searches join it into the
+campsite query itself, so the other catalog filters, ranking and
+pagination all happen in the database. Other database backends fall back
+to unranked substring matching.
+"""
+
+import re
+import threading
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+
+from api.models import Campsite, Review
+
+SEARCH_TABLE = "campsite_search"
+
+
+def create_search_index(sender=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Create the search index table if it doesn't exist (post_migrate)."""
+    db = connections[using]
+    with db.cursor() as cursor:
+        if db.vendor == "sqlite":
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+                "campsite_id UNINDEXED, description, reviews, "
+                "tokenize='porter unicode61')"
+            )
+        elif db.vendor == "postgresql":
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+                "campsite_id bigint PRIMARY KEY "
+                f"REFERENCES {Campsite._meta.db_table} (id) ON DELETE CASCADE, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx "
+                f"ON {SEARCH_TABLE} USING GIN (document)"
+            )
+
+    if db.vendor == "sqlite":
+        # Documents are stored under rowid = campsite_id so a campsite's
+        # rank can be looked up directly. Reindex older tables that weren't.
+        with db.cursor() as cursor:
+            cursor.execute(
+                f"SELECT 1 FROM {SEARCH_TABLE} WHERE rowid != campsite_id LIMIT 1"
+            )
+            stale = cursor.fetchone() is not None
+        if stale:
+            rebuild_search_index(using)
+
+
+def write_documents(cursor, vendor, documents):
+    """Store (campsite_id, description, reviews) documents, replacing old ones."""
+    if vendor == "sqlite":
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} "
+            "(rowid, campsite_id, description, reviews) VALUES (%s, %s, %s, %s)",
+            [
+                (campsite_id, campsite_id, description, reviews)
+                for campsite_id, description, reviews in documents
+            ],
+        )
+    else:
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (campsite_id, document) VALUES (%s, "
+            "setweight(to_tsvector('english', %s), 'A') || "
+            "setweight(to_tsvector('english', %s), 'B')) "
+            "ON CONFLICT (campsite_id) DO UPDATE SET document = EXCLUDED.document",
+            list(documents),
+        )
+
+
+def index_campsite(campsite_id, using=DEFAULT_DB_ALIAS):
+    """(Re)build the search document of one campsite."""
+    db = connections[using]
+    if db.vendor not in ("sqlite", "postgresql"):
+        return
+    description = (
+        Campsite.objects.using(using)
+        .filter(pk=campsite_id)
+        .values_list("description", flat=True)
+        .first()
+    )
+    if description is None:
+        remove_campsite(campsite_id, using)
+        return
+    reviews = " ".join(
+        Review.objects.using(using)
+        .filter(campground_id=campsite_id)
+        .exclude(comment=None)
+        .values_list("comment", flat=True)
+    )
+    with db.cursor() as cursor:
+        write_documents(cursor, db.vendor, [(campsite_id, description, reviews)])
+
+
+def add_review(campsite_id, comment, using=DEFAULT_DB_ALIAS):
+    """
+    Append a new review's comment to its campsite's search document,
+    without rereading the other reviews. Indexes the campsite in full if it
+    has no document yet.
+    """
+    db = connections[using]
+    if db.vendor not in ("sqlite", "postgresql"):
+        return
+    with db.cursor() as cursor:
+        if db.vendor == "sqlite":
+            cursor.execute(
+                f"UPDATE {SEARCH_TABLE} SET reviews = reviews || ' ' || %s "
+                "WHERE rowid = %s",
+                [comment, campsite_id],
+            )
+        else:
+            cursor.execute(
+                f"UPDATE {SEARCH_TABLE} SET document = document || "
+                "setweight(to_tsvector('english', %s), 'B') WHERE campsite_id = %s",
+                [comment, campsite_id],
+            )
+        updated = cursor.rowcount
+    if not updated:
+        index_campsite(campsite_id, using)
+
+
+def remove_campsite(campsite_id, using=DEFAULT_DB_ALIAS):
+    """Drop a campsite's search document."""
+    db = connections[using]
+    if db.vendor not in ("sqlite", "postgresql"):
+        return
+    # rowid is the FTS5 table's key; campsite_id is unindexed there
+    column = "rowid" if db.vendor == "sqlite" else "campsite_id"
+    with db.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE {column} = %s", [campsite_id]
+        )
+
+
+def rebuild_search_index(using=DEFAULT_DB_ALIAS):
+    """Rebuild every campsite's search document. Returns the count indexed."""
+    db = connections[using]
+    if db.vendor not in ("sqlite", "postgresql"):
+        return 0
+    comments = defaultdict(list)
+    for campsite_id, comment in (
+        Review.objects.using(using)
+        .exclude(comment=None)
+        .order_by("campground_id", "id")
+        .values_list("campground_id", "comment")
+        .iterator()
+    ):
+        comments[campsite_id].append(comment)
+    documents = [
+        (campsite_id, description, " ".join(comments[campsite_id]))
+        for campsite_id, description in Campsite.objects.using(using)
+        .values_list("id", "description")
+        .iterator()
+    ]
+    with db.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        write_documents(cursor, db.vendor, documents)
+    return len(documents)
+
+
+# Per thread and database: campsite id -> marker of the latest reindex
+# scheduled for it, so only that one runs
+_pending = threading.local()
+
+
+def pending_reindexes(using):
+    """This thread's scheduled reindexes on database ``using``."""
+    return _pending.__dict__.setdefault(using, {})
+
+
+def index_on_commit(campsite_id, using=DEFAULT_DB_ALIAS):
+    """
+    Reindex a campsite once the current transaction commits. However many
+    times a transaction asks (e.g. a cascade deleting every review of a
+    campsite), the campsite is reindexed once.
+    """
+    pending = pending_reindexes(using)
+    marker = pending[campsite_id] = object()
+
+    def index():
+        if pending.get(campsite_id) is marker:
+            del pending[campsite_id]
+            index_campsite(campsite_id, using)
+
+    transaction.on_commit(index, using=using)
+
+
+def add_review_on_commit(campsite_id, comment, using=DEFAULT_DB_ALIAS):
+    """Append a new review's comment once the current transaction commits."""
+    if campsite_id in pending_reindexes(using):
+        # A full reindex is due anyway and will include the comment
+        index_on_commit(campsite_id, using)
+        return
+    transaction.on_commit(
+        lambda: add_review(campsite_id, comment, using), using=using
+    )
+
+
+def match_query(query):
+    """
+    The full-text query to run for ``query``, or None if it has no terms.
+    On SQLite every term is quoted so user input can't inject FTS5 syntax.
+    """
+    if connection.vendor != "sqlite":
+        return query
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def matching_ids(match):
+    """Subquery of the ids of campsites whose document matches ``match``."""
+    if connection.vendor == "sqlite":
+        return RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s",
+            [match],
+        )
+    return RawSQL(
+        f"SELECT campsite_id FROM {SEARCH_TABLE} "
+        "WHERE document @@ websearch_to_tsquery('english', %s)",
+        [match],
+    )
+
+
+class SearchRank(Func):
+    """
+    Relevance of the campsite with the given id for a full-text query,
+    higher is better. Only meaningful for campsites in matching_ids().
+    """
+
+    output_field = FloatField()
+
+    def __init__(self, expression, match):
+        super().__init__(expression)
+        self.match = match
+
+    def as_sqlite(self, compiler, connection):
+        campsite_id, params = compiler.compile(self.source_expressions[0])
+        # bm25() is lower for better matches; weights are per column
+        return (
+            f"(SELECT -bm25({SEARCH_TABLE}, 0, 2.0, 1.0) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rowid = {campsite_id})",
+            [self.match, *params],
+        )
+
+    def as_postgresql(self, compiler, connection):
+        campsite_id, params = compiler.compile(self.source_expressions[0])
+        return (
+            "(SELECT ts_rank(document, websearch_to_tsquery('english', %s)) "
+            f"FROM {SEARCH_TABLE} WHERE campsite_id = {campsite_id})",
+            [self.match, *params],
+        )
+
+
+def search_campsites(campsites, query):
+    """Restrict a campsite queryset to search hits, annotated with search_rank."""
+    if connection.vendor not in ("sqlite", "postgresql"):
+        return (
+            campsites.filter(
+                Q(description__icontains=query) | Q(reviews__comment__icontains=query)
+            )
+            .distinct()
+            .annotate(search_rank=Value(0.0, output_field=FloatField()))
+        )
+
+    match = match_query(query)
+    if match is None:
+        return campsites.none().annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+    return campsites.filter(id__in=matching_ids(match)).annotate(
+        search_rank=SearchRank(F("id"), match)
+    )
@@ -1,2 +1,6 @@
 from .camper_serializers import CamperProfileSerializer
-from .campsite_serializers import CampsiteSerializer, ReviewSerializer
+from .campsite_serializers import (
+    CampsiteSerializer,
+    CampsiteSummarySerializer,
+    ReviewSerializer,
+)
@@ -1,11 +1,39 @@
-from api.serializers.campsite_serializers import CampsiteSerializer
+from api.serializers.campsite_serializers import (
+    CampsiteSerializer,
+    CampsiteSummarySerializer,
+)
 from rest_framework import serializers
 from api.models import Camper, PaymentMethod, Reservation
 from django.contrib.auth.models import User
 
 
+def expands_campsite(context):
+    """Whether the request asked for full campsites with ``expand=campsite``."""
+    request = context.get("request")
+    if request is None:
+        return False
+    return "campsite" in request.query_params.get("expand", "").split(",")
+
+
+def reservations_for_serializer(reservations, context):
+    """Load the campsites a page of reservations embeds in bulk."""
+    reservations = reservations.select_related("campsite")
+    if expands_campsite(context):
+        return reservations.prefetch_related(
+            "campsite__images",
+            "campsite__amenities__amenity",
+            "campsite__reviews__camper__user",
+        )
+    return reservations.prefetch_related("campsite__images")
+
+
 class ReservationSerializer(serializers.ModelSerializer):
-    """Serializer for Reservation model."""
+    """
+    Serializer for Reservation model.
+
+    Embeds a compact campsite (id, site_number, thumbnail) unless the
+    request asks for the full campsite with ``expand=campsite``.
+    """
     campsite = serializers.SerializerMethodField()
 
     class Meta:
@@ -15,17 +43,18 @@ class ReservationSerializer(serializers.ModelSerializer):
             "campsite",
             "check_in_date",
             "check_out_date",
+            "number_of_guests",
             "total_price",
             "status",
         ]
         read_only_fields = ["id", "created_at", "updated_at"]
-        depth = 7
 
 
     def get_campsite(self, obj):
         """Get campsite for reservation"""
-        
-        return CampsiteSerializer(obj.campsite, many=False, context=self.context ).data
+        if expands_campsite(self.context):
+            return CampsiteSerializer(obj.campsite, context=self.context).data
+        return CampsiteSummarySerializer(obj.campsite, context=self.context).data
 
 
 
@@ -78,20 +107,12 @@ class CamperProfileSerializer(serializers.ModelSerializer):
     """Serializer for Camper profile data."""
     user = UserSerializer(read_only=True)
     payment_methods = serializers.SerializerMethodField()
-    reservation_history = serializers.SerializerMethodField()
     is_admin = serializers.SerializerMethodField()
 
-    def get_reservation_history(self, obj):
-        """Get the reservation history for the camper."""
-        reservations = obj.reservations.filter(
-            camper=obj,
-        ).order_by("-check_in_date")
-        return ReservationSerializer(reservations, many=True, context=self.context).data
-
     def get_payment_methods(self, obj):
         """Get the payment methods for the camper."""
-        user_methods = PaymentMethod.objects.filter(camper=obj)
-        return PaymentMethodSerializer(user_methods, many=True).data
+        # Uses prefetched payment methods when the caller loaded them
+        return PaymentMethodSerializer(obj.payment_methods.all(), many=True).data
         # Assuming you have a PaymentMethodSerializer defined elsewhere
     def get_is_admin(self,obj):
         return obj.user.is_staff
@@ -103,7 +124,6 @@ class CamperProfileSerializer(serializers.ModelSerializer):
             "user",
             "is_admin",
             "payment_methods",
-            "reservation_history",
             "age",
             "phone_number",
         ]
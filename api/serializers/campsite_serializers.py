@@ -3,6 +3,7 @@ from api.models import Campsite, Amenity, CampsiteAmenity, amenities
 from api.models import CampsiteImage
 
 from api.models import Review
+from api.images import srcset, variant_urls
 
 
 class ReviewSerializer(serializers.ModelSerializer):
@@ -29,10 +30,23 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 
 class CampsiteImageSerializer(serializers.ModelSerializer):
+    """
+    Serializer for CampsiteImage model, with the downscaled variants as
+    ``variants`` and ready-made ``srcset`` strings per encoding.
+    """
+    variants = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
+
+    def get_variants(self, obj):
+        return variant_urls(obj, self.context.get("request"))
+
+    def get_srcset(self, obj):
+        urls = variant_urls(obj, self.context.get("request"))
+        return {extension: srcset(urls, extension) for extension in ("webp", "jpeg")}
 
     class Meta:
         model = CampsiteImage
-        fields = ["id", "image_url"]
+        fields = ["id", "image_url", "variants", "srcset"]
         depth = 1
 
 class AmenitySerializer(serializers.ModelSerializer):
@@ -51,11 +65,70 @@ class CampsiteAmenitySerializer(serializers.ModelSerializer):
 
 
 
+def thumbnail_url(campsite, request=None):
+    """
+    URL of a campsite's first image, or None if it has no images. Uses the
+    image's thumb variant when it has one.
+    """
+    image = next(iter(campsite.images.all()), None)
+    if image is None or not image.image_url:
+        return None
+    thumb = image.variants.get("thumb", {}).get("webp")
+    url = image.image_url.storage.url(thumb) if thumb else image.image_url.url
+    return request.build_absolute_uri(url) if request else url
+
+
+class CampsiteSummarySerializer(serializers.ModelSerializer):
+    """Compact campsite representation for embedding in other resources."""
+    thumbnail = serializers.SerializerMethodField()
+
+    def get_thumbnail(self, obj):
+        """Return the URL of the campsite's first image, if it has one."""
+        return thumbnail_url(obj, self.context.get("request"))
+
+    class Meta:
+        model = Campsite
+        fields = ["id", "site_number", "thumbnail"]
+
+
 class CampsiteSerializer(serializers.ModelSerializer):
-    """Serializer for Campsite model."""
+    """
+    Serializer for Campsite model.
+
+    Accepts optional ``fields`` and ``expand`` keyword arguments for sparse
+    fieldsets: when ``fields`` is given only those fields are rendered, and
+    the heavier nested fields are added back only if named in ``expand``.
+    """
     images = CampsiteImageSerializer(many=True, read_only=True)
+    thumbnail = serializers.SerializerMethodField()
     reviews = serializers.SerializerMethodField()
     amenities = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
+
+    expandable_fields = ("reviews", "amenities", "images")
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.select_fields(fields, expand)
+        if selected is not None:
+            for name in set(self.fields) - selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def select_fields(cls, fields=None, expand=None):
+        """Return the set of field names to render, or None for all of them."""
+        if fields is None:
+            return None
+        return set(fields) | (set(expand or ()) & set(cls.expandable_fields))
+
+    def get_thumbnail(self, obj):
+        """Return the URL of the campsite's first image, if it has one."""
+        return thumbnail_url(obj, self.context.get("request"))
+
+    def get_distance_km(self, obj):
+        """Distance from the ``near`` point of a radius search, if any."""
+        distance = getattr(obj, "distance_km", None)
+        return round(distance, 3) if distance is not None else None
 
     def get_reviews(self, obj):
         """Return the reviews for the campsite."""
@@ -76,13 +149,30 @@ class CampsiteSerializer(serializers.ModelSerializer):
             "site_number",
             "description",
             "coordinates",
+            "latitude",
+            "longitude",
+            "distance_km",
             "reviews",
+            "rating_avg",
+            "rating_count",
+            "rating_histogram",
             "price_per_night",
             "max_occupancy",
             "available",
             "created_at",
             "updated_at",
+            "thumbnail",
             "images",
         ]
+        read_only_fields = [
+            "id",
+            "created_at",
+            "updated_at",
+            "latitude",
+            "longitude",
+            "rating_avg",
+            "rating_count",
+            "rating_histogram",
+        ]
         depth = 1
 
@@ -0,0 +1,187 @@
+"""Signal handlers keeping denormalized data in step with its sources."""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from django.contrib.auth.models import User
+from rest_framework.authtoken.models import Token
+
+from api.authentication import evict_tokens, evict_user_tokens
+from api.cache import invalidate_campsite, invalidate_catalog
+from api.images import (
+    generate_variants,
+    has_current_variants,
+    release_image_files,
+    shared_variants,
+)
+from api.search import add_review_on_commit, index_on_commit
+from api.models import (
+    Amenity,
+    Camper,
+    Campsite,
+    CampsiteAmenity,
+    CampsiteImage,
+    DailyOccupancy,
+    Reservation,
+    Review,
+)
+
+
+@receiver(post_save, sender=Reservation)
+def refresh_daily_occupancy(sender, instance, raw=False, **kwargs):
+    """Rewrite the occupancy rollup rows for a saved reservation."""
+    # Rows removed by deleting a reservation go with it through the
+    # cascading foreign key, so only saves need handling here.
+    if raw:
+        return
+    DailyOccupancy.objects.refresh_for(instance)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def refresh_rating_aggregates(sender, instance, raw=False, **kwargs):
+    """Recompute the review aggregates of the reviewed campsite."""
+    if raw:
+        return
+    with transaction.atomic():
+        # Lock the campsite so concurrent reviews can't interleave their
+        # read-and-write of its aggregates.
+        campsite = (
+            Campsite.objects.select_for_update()
+            .filter(pk=instance.campground_id)
+            .first()
+        )
+        if campsite is not None:
+            campsite.refresh_rating_aggregates()
+
+
+@receiver([post_save, post_delete], sender=Campsite)
+def invalidate_cached_campsite(sender, instance, **kwargs):
+    """Drop cached payloads of a changed campsite."""
+    invalidate_campsite(instance.pk)
+
+
+@receiver(post_save, sender=CampsiteImage)
+def render_campsite_image_variants(sender, instance, raw=False, **kwargs):
+    """Render downscaled variants of a new or replaced campsite image."""
+    if raw or not instance.image_url or has_current_variants(instance):
+        return
+
+    def render():
+        try:
+            instance.variants = shared_variants(instance) or generate_variants(
+                instance
+            )
+        except OSError:
+            return  # Unreadable upload: served at its original size
+        instance.save(update_fields=["variants"])
+
+    transaction.on_commit(render)
+
+
+@receiver(pre_save, sender=CampsiteImage)
+def remember_replaced_campsite_image(
+    sender, instance, raw=False, update_fields=None, **kwargs
+):
+    """Note the stored file an image is about to stop referencing."""
+    instance._replaced_file = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "image_url" not in update_fields:
+        return
+    stored = (
+        CampsiteImage.objects.filter(pk=instance.pk)
+        .values_list("image_url", "variants")
+        .first()
+    )
+    if stored and stored[0] != instance.image_url.name:
+        instance._replaced_file = stored
+
+
+@receiver(post_save, sender=CampsiteImage)
+def release_replaced_campsite_image(sender, instance, **kwargs):
+    """Delete the previous file and variants of a replaced image."""
+    replaced = getattr(instance, "_replaced_file", None)
+    if replaced:
+        transaction.on_commit(lambda: release_image_files(*replaced))
+
+
+@receiver(post_delete, sender=CampsiteImage)
+def release_campsite_image_file(sender, instance, **kwargs):
+    """Delete a removed image's file and variants unless another image shares them."""
+    name, variants = instance.image_url.name, instance.variants
+    transaction.on_commit(lambda: release_image_files(name, variants))
+
+
+@receiver([post_save, post_delete], sender=CampsiteImage)
+@receiver([post_save, post_delete], sender=CampsiteAmenity)
+def invalidate_cached_campsite_relation(sender, instance, **kwargs):
+    """Drop cached payloads of the campsite an image or amenity belongs to."""
+    invalidate_campsite(instance.campsite_id)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_cached_campsite_review(sender, instance, **kwargs):
+    """Drop cached payloads of the campsite a review is about."""
+    invalidate_campsite(instance.campground_id)
+
+
+@receiver([post_save, post_delete], sender=Amenity)
+def invalidate_cached_catalog(sender, instance, **kwargs):
+    """Amenity names appear on every campsite, so drop everything."""
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Campsite)
+def index_saved_campsite(
+    sender, instance, using, raw=False, update_fields=None, **kwargs
+):
+    """Refresh the search document when the description may have changed."""
+    if raw or (update_fields is not None and "description" not in update_fields):
+        return
+    index_on_commit(instance.pk, using)
+
+
+@receiver(post_delete, sender=Campsite)
+def unindex_deleted_campsite(sender, instance, using, **kwargs):
+    """Drop the search document of a deleted campsite."""
+    index_on_commit(instance.pk, using)
+
+
+@receiver(post_save, sender=Review)
+def index_saved_review(sender, instance, using, created=False, raw=False, **kwargs):
+    """Add a new review's comment to its campsite's search document."""
+    if raw:
+        return
+    if created:
+        if instance.comment:
+            add_review_on_commit(instance.campground_id, instance.comment, using)
+    else:
+        # The old comment can't be picked out of the document
+        index_on_commit(instance.campground_id, using)
+
+
+@receiver(post_delete, sender=Review)
+def unindex_deleted_review(sender, instance, using, **kwargs):
+    """Rebuild the search document of the campsite a review was about."""
+    index_on_commit(instance.campground_id, using)
+
+
+@receiver([post_save, post_delete], sender=Token)
+def evict_cached_token(sender, instance, **kwargs):
+    """Forget a changed or deleted token."""
+    evict_tokens(instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def evict_cached_user_tokens(sender, instance, **kwargs):
+    """Forget the tokens of a changed user so they reload its new state."""
+    if kwargs.get("created"):
+        return  # A brand new user has no cached tokens yet
+    evict_user_tokens(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Camper)
+def evict_cached_camper_tokens(sender, instance, **kwargs):
+    """Forget the tokens of a user whose camper profile changed."""
+    evict_user_tokens(instance.user_id)
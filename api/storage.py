@@ -0,0 +1,127 @@
+"""Content-addressed file storage for campsite images.
+
+Django's default storage renames colliding uploads (``site01_8BrWHmY.jpg``),
+so uploading the same photo twice stores it twice. ContentAddressedStorage
+names every file after the SHA-256 of its bytes instead, hashing the upload
+while it streams to disk::
+
+    campsite_images/3f/3fa9…e1.jpg
+
+Identical uploads land on the same name and are stored once. Several
+CampsiteImage rows can then share one file, so files are only deleted once
+no row references them (see api/signals.py). The
+``dedupe_campsite_images`` management command moves existing files over.
+
+An upload that lands on an existing file keeps it, but its row is only
+committed a moment later, so a concurrent release could see the file as
+unreferenced and delete it under the new row. Saves and releases therefore
+take a shared file lock, saves refresh the file's modification time, and
+releases leave files modified within ``release_grace`` seconds alone.
+Files spared that way are swept by ``dedupe_campsite_images --prune``.
+"""
+
+import hashlib
+import os
+import posixpath
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.files import locks
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct file once, under its hash."""
+
+    # Seconds a saved file is kept from release, covering the transaction
+    # that commits the row referencing it
+    release_grace = 15 * 60
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content has been hashed
+        # in _save, and identical names there mean identical content.
+        return name
+
+    def content_name(self, name, digest):
+        """Storage name for content with ``digest`` uploaded as ``name``."""
+        directory = posixpath.dirname(name)
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def is_content_name(self, name):
+        """Whether ``name`` already has the content-addressed layout."""
+        stem = posixpath.splitext(posixpath.basename(name))[0]
+        shard = posixpath.basename(posixpath.dirname(name))
+        return len(stem) == 64 and shard == stem[:2]
+
+    def _save(self, name, content):
+        os.makedirs(self.location, exist_ok=True)
+        digest = hashlib.sha256()
+        # Stream to a temporary file in the storage root (the same
+        # filesystem, so the final rename is atomic) while hashing
+        temporary = tempfile.NamedTemporaryFile(
+            dir=self.location, prefix=".upload-", delete=False
+        )
+        try:
+            with temporary:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temporary.write(chunk)
+
+            name = self.content_name(name, digest.hexdigest())
+            path = self.path(name)
+            with self.lock():
+                if os.path.exists(path):
+                    os.remove(temporary.name)
+                    os.utime(path)  # Restart the release grace period
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(temporary.name, path)
+                    os.chmod(path, self.file_permissions_mode or 0o644)
+        except BaseException:
+            if os.path.exists(temporary.name):
+                os.remove(temporary.name)
+            raise
+        return name
+
+    @contextmanager
+    def lock(self):
+        """Hold the storage-wide lock serializing saves and releases."""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, ".lock"), "a") as lock_file:
+            locks.lock(lock_file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(lock_file)
+
+    def release(self, names, referenced):
+        """
+        Delete the files in ``names`` that are neither in the set returned
+        by ``referenced(names)`` nor saved within the grace period.
+        Returns the deleted names.
+        """
+        names = [name for name in dict.fromkeys(names) if name]
+        if not names:
+            return []
+        deleted = []
+        with self.lock():
+            live = referenced(names)
+            cutoff = time.time() - self.release_grace
+            for name in names:
+                if name in live:
+                    continue
+                try:
+                    if os.path.getmtime(self.path(name)) > cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+                self.delete(name)
+                deleted.append(name)
+        return deleted
+
+
+campsite_image_storage = ContentAddressedStorage()
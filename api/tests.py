@@ -0,0 +1,782 @@
+import io
+import tempfile
+import threading
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from PIL import Image as PILImage
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import hashing
+from api.authentication import (
+    CachedTokenAuthentication,
+    local_token_cache,
+    token_cache_key,
+)
+from api.images import (
+    generate_variants,
+    has_current_variants,
+    srcset,
+    variant_names,
+    variant_urls,
+)
+from api.search import rebuild_search_index
+from api.storage import campsite_image_storage
+from api.models import (
+    Amenity,
+    Camper,
+    Campsite,
+    CampsiteAmenity,
+    CampsiteImage,
+    DailyOccupancy,
+    Reservation,
+    Review,
+)
+
+
+def make_camper(username):
+    user = User.objects.create_user(username=username, password="password")
+    return Camper.objects.create(user=user)
+
+
+def make_campsite(number, **fields):
+    defaults = {
+        "site_number": f"A{number:03}",
+        "description": f"Campsite {number}",
+        "coordinates": "34.4,-119.8",
+        "price_per_night": Decimal("40.00"),
+        "max_occupancy": 4,
+    }
+    defaults.update(fields)
+    return Campsite.objects.create(**defaults)
+
+
+class CampsiteListQueryTests(TestCase):
+    """The campsite list runs a fixed number of queries however many sites exist."""
+
+    @classmethod
+    def setUpTestData(cls):
+        amenities = [
+            Amenity.objects.create(name=name) for name in ("Water", "Fire pit")
+        ]
+        campers = [make_camper(f"camper{i}") for i in range(3)]
+        for number in range(6):
+            campsite = make_campsite(number)
+            CampsiteImage.objects.create(
+                campsite=campsite, image_url=f"campsite_images/site{number}.jpg"
+            )
+            for amenity in amenities:
+                CampsiteAmenity.objects.create(campsite=campsite, amenity=amenity)
+            for camper in campers:
+                Review.objects.create(
+                    camper=camper, campground=campsite, rating=4, comment="Nice"
+                )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_query_count(self):
+        # Eight queries: the page, images, amenities and their names,
+        # reviews with their campers and users, and the amenity facets.
+        # (Seven before the facets were added to list responses.)
+        with self.assertNumQueries(8):
+            response = self.client.get("/api/campsites?expand=reviews")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 6)
+        self.assertEqual(len(response.json()["results"][0]["reviews"]), 3)
+
+    def test_thumbnail_is_the_first_uploaded_image(self):
+        campsite = Campsite.objects.get(site_number="A000")
+        CampsiteImage.objects.create(
+            campsite=campsite, image_url="campsite_images/later.jpg"
+        )
+        response = self.client.get("/api/campsites", {"fields": "id,thumbnail"})
+        thumbnails = {
+            site["id"]: site["thumbnail"] for site in response.json()["results"]
+        }
+        self.assertTrue(thumbnails[campsite.pk].endswith("/site0.jpg"))
+
+    def test_non_finite_filters_are_rejected(self):
+        for value in ("NaN", "Infinity", "-inf", "sNaN"):
+            response = self.client.get("/api/campsites", {"min_price": value})
+            self.assertEqual(response.status_code, 400, value)
+
+    def test_out_of_range_ids_are_rejected(self):
+        for name in ("amenities", "amenities_any"):
+            for value in ("99999999999999999999999", "0", "-3"):
+                response = self.client.get("/api/campsites", {name: value})
+                self.assertEqual(response.status_code, 400, (name, value))
+
+
+class CampsiteETagTests(TestCase):
+    """ETags follow the payload, not the process that cached it."""
+
+    def setUp(self):
+        cache.clear()
+        self.campsite = make_campsite(1)
+
+    def test_etag_is_derived_from_the_payload(self):
+        url = f"/api/campsites/{self.campsite.pk}"
+        etag = self.client.get(url)["ETag"]
+
+        # Another worker with an empty cache computes the same ETag
+        cache.clear()
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.campsite.description = "Closer to the water"
+            self.campsite.save()
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_versions_bump_on_commit(self):
+        url = f"/api/campsites/{self.campsite.pk}"
+        etag = self.client.get(url)["ETag"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                self.campsite.description = "Closer to the water"
+                self.campsite.save()
+                # Until commit, the cached payload still answers
+                response = self.client.get(url, headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 304)
+        for callback in callbacks:
+            callback()
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class CampsiteSearchTests(TestCase):
+    """Full-text search ranks and filters in the same query."""
+
+    def setUp(self):
+        cache.clear()
+        # The index is updated once each transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lake = make_campsite(
+                1, description="Lake view, lake access, lake breeze"
+            )
+            self.shore = make_campsite(2, description="Shady pines near the lake")
+            self.pricey = make_campsite(
+                3, description="Lake front lake cabin", price_per_night=Decimal("90.00")
+            )
+            make_campsite(4, description="Desert mesa")
+
+    def search(self, **params):
+        response = self.client.get("/api/campsites", {"fields": "id", **params})
+        self.assertEqual(response.status_code, 200)
+        return [campsite["id"] for campsite in response.json()["results"]]
+
+    def test_best_match_first(self):
+        self.assertEqual(
+            self.search(q="lake"), [self.lake.pk, self.pricey.pk, self.shore.pk]
+        )
+
+    def test_filters_apply_to_search_hits(self):
+        self.assertEqual(
+            self.search(q="lake", max_price="50"), [self.lake.pk, self.shore.pk]
+        )
+        self.assertEqual(self.search(q="pines", max_price="50"), [self.shore.pk])
+
+    async def test_async_list_matches(self):
+        response = await AsyncClient().get(
+            "/api/async/campsites", {"fields": "id", "q": "lake", "max_price": "50"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [campsite["id"] for campsite in response.json()["results"]],
+            [self.lake.pk, self.shore.pk],
+        )
+        self.assertEqual(self.search(q="!!!"), [])
+
+    def test_new_review_is_appended(self):
+        camper = make_camper("reviewer")
+        with self.captureOnCommitCallbacks() as callbacks:
+            Review.objects.create(
+                camper=camper, campground=self.shore, rating=5, comment="Owls at dusk"
+            )
+        # One UPDATE appends the comment; the other reviews aren't reread
+        with self.assertNumQueries(1):
+            for callback in callbacks:
+                callback()
+        cache.clear()
+        self.assertEqual(self.search(q="owls"), [self.shore.pk])
+
+    def test_cascade_reindexes_once(self):
+        camper = make_camper("reviewer")
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                Review.objects.create(
+                    camper=camper, campground=self.lake, rating=4, comment="Calm"
+                )
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.lake.delete()
+        # The campsite is gone: one lookup finds that, one DELETE drops it
+        with self.assertNumQueries(2):
+            for callback in callbacks:
+                callback()
+        cache.clear()
+        self.assertEqual(self.search(q="calm"), [])
+        self.assertEqual(self.search(q="lake"), [self.pricey.pk, self.shore.pk])
+
+    def test_rebuild(self):
+        camper = make_camper("reviewer")
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(
+                camper=camper, campground=self.pricey, rating=4, comment="Owls"
+            )
+        self.assertEqual(rebuild_search_index(), 4)
+        self.assertEqual(self.search(q="owls"), [self.pricey.pk])
+
+
+class GeoFilterTests(TestCase):
+    """Radius and viewport filters, including across the antimeridian."""
+
+    def setUp(self):
+        cache.clear()
+        self.santa_barbara = make_campsite(1, coordinates="34.4208,-119.6982")
+        self.los_angeles = make_campsite(2, coordinates="34.0522,-118.2437")
+        self.fiji = make_campsite(3, coordinates="-17.7134,178.0650")
+        self.samoa = make_campsite(4, coordinates="-13.8333,-171.7500")
+
+    def get(self, **params):
+        return self.client.get("/api/campsites", {"fields": "id,distance_km", **params})
+
+    def ids(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(campsite["id"] for campsite in response.json()["results"])
+
+    def test_near_orders_by_haversine_distance(self):
+        response = self.get(near="34.4208,-119.6982", radius_km="200")
+        results = response.json()["results"]
+        self.assertEqual(
+            [campsite["id"] for campsite in results],
+            [self.santa_barbara.pk, self.los_angeles.pk],
+        )
+        self.assertAlmostEqual(results[0]["distance_km"], 0, places=3)
+        self.assertAlmostEqual(results[1]["distance_km"], 139.85, delta=0.01)
+        self.assertEqual(
+            self.ids(near="34.4208,-119.6982", radius_km="100"), [self.santa_barbara.pk]
+        )
+
+    def test_near_across_the_antimeridian(self):
+        self.assertEqual(
+            self.ids(near="-15.5,179.5", radius_km="1200"),
+            [self.fiji.pk, self.samoa.pk],
+        )
+
+    def test_bbox(self):
+        self.assertEqual(
+            self.ids(bbox="-120,34,-118,35"),
+            [self.santa_barbara.pk, self.los_angeles.pk],
+        )
+        # West edge east of the east edge: the box crosses the antimeridian
+        self.assertEqual(
+            self.ids(bbox="170,-20,-170,-10"), [self.fiji.pk, self.samoa.pk]
+        )
+
+    def test_invalid_coordinates(self):
+        for params in (
+            {"near": "95,0"},
+            {"near": "0,181"},
+            {"bbox": "0,10,5,5"},
+            {"bbox": "-200,0,10,10"},
+            {"bbox": "0,-91,10,10"},
+        ):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0)
+class TokenCacheTests(TestCase):
+    """Cached token lookups keep secrets out of the cache."""
+
+    def setUp(self):
+        cache.clear()
+        local_token_cache.clear()
+        self.camper = make_camper("cached")
+        self.camper.phone_number = "555-0100"
+        self.camper.save()
+        self.token = Token.objects.create(user=self.camper.user)
+        self.headers = {"Authorization": f"Token {self.token.key}"}
+
+    def test_entry_holds_no_secrets(self):
+        self.client.get("/api/auth/profile", headers=self.headers)
+        entry = cache.get(token_cache_key(self.token.key))
+        self.assertNotIn("password", entry["user"])
+        self.assertNotIn(self.token.key, repr(entry))
+        self.assertNotIn(self.camper.user.password, repr(entry))
+
+    def test_profile_from_cache(self):
+        self.client.get("/api/auth/profile", headers=self.headers)
+        local_token_cache.clear()
+        # Only the payment methods query; the user and camper come from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/auth/profile", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["username"], "cached")
+        self.assertEqual(response.json()["phone_number"], "555-0100")
+
+    def test_saving_a_cached_user_keeps_the_password(self):
+        self.client.get("/api/auth/profile", headers=self.headers)
+        user, token = CachedTokenAuthentication().authenticate_credentials(
+            self.token.key
+        )
+        self.assertEqual(token.key, self.token.key)
+        user.first_name = "Casey"
+        user.save()
+        user = User.objects.get(pk=user.pk)
+        self.assertEqual(user.first_name, "Casey")
+        self.assertTrue(user.check_password("password"))
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0, PASSWORD_PBKDF2_ITERATIONS=1000)
+class AsyncAuthTests(TestCase):
+    """The async login and register views match the sync ones."""
+
+    async def test_register_then_login(self):
+        client = AsyncClient()
+        response = await client.post(
+            "/api/async/auth/register",
+            {
+                "username": "async",
+                "password": "s3cret-pass",
+                "email": "async@example.com",
+                "first_name": "Ash",
+                "last_name": "Sync",
+            },
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        token = response.json()["token"]
+        user = await User.objects.aget(username="async")
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+
+        response = await client.post(
+            "/api/async/auth/login",
+            {"username": "async", "password": "s3cret-pass"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["token"], token)
+
+        response = await client.post(
+            "/api/async/auth/login",
+            {"username": "async", "password": "wrong"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0, PASSWORD_PBKDF2_ITERATIONS=1000)
+class LoginTests(TestCase):
+    """Logins go through the auth backends and pay for a hash every time."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("login", password="s3cret-pass")
+
+    def login(self, password="s3cret-pass", username="login"):
+        return self.client.post(
+            "/api/auth/login",
+            {"username": username, "password": password},
+            content_type="application/json",
+        )
+
+    def test_iterations_follow_settings(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+    def test_outdated_hash_is_upgraded(self):
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.user.set_password("s3cret-pass")
+            self.user.save()
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+    def test_failed_logins_signal_and_hash(self):
+        failures = []
+
+        def record(sender, credentials, **kwargs):
+            failures.append(credentials["username"])
+
+        user_login_failed.connect(record)
+        self.addCleanup(user_login_failed.disconnect, record)
+        self.user.is_active = False
+        self.user.save()
+
+        with mock.patch(
+            "api.hashing.check_password", wraps=hashing.check_password
+        ) as check, mock.patch(
+            "api.hashing.make_password", wraps=hashing.make_password
+        ) as make:
+            self.assertEqual(self.login().status_code, 401)  # inactive
+            self.assertEqual(self.login(username="nobody").status_code, 401)
+        self.assertEqual(check.call_count, 1)
+        self.assertEqual(make.call_count, 1)
+        self.assertEqual(failures, ["login", "nobody"])
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0, PASSWORD_PBKDF2_ITERATIONS=1000)
+class RegisterTests(TestCase):
+    """Only a real username clash is reported as one."""
+
+    def register(self, **fields):
+        body = {
+            "username": "newcamper",
+            "password": "s3cret-pass",
+            "email": "new@example.com",
+            "first_name": "New",
+            "last_name": "Camper",
+            **fields,
+        }
+        return self.client.post(
+            "/api/auth/register", body, content_type="application/json"
+        )
+
+    def test_duplicate_username(self):
+        self.assertEqual(self.register().status_code, 201)
+        response = self.register(email="other@example.com")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "Username already exists"})
+        self.assertEqual(User.objects.filter(username="newcamper").count(), 1)
+
+    def test_other_integrity_errors_propagate(self):
+        with self.assertRaises(IntegrityError):
+            self.register(age=-1)
+        self.assertFalse(User.objects.filter(username="newcamper").exists())
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0, PASSWORD_PBKDF2_ITERATIONS=1000)
+class ImportCampersTests(TestCase):
+    def import_csv(self, text):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "campers.csv"
+        path.write_text(text)
+        out = io.StringIO()
+        call_command("import_campers", str(path), stdout=out)
+        return out.getvalue()
+
+    def test_imports_and_skips_existing(self):
+        make_camper("taken")
+        output = self.import_csv(
+            "username,password,age\n"
+            "taken,x,30\n"
+            "fresh,s3cret-pass,41\n"
+            "fresh,other,12\n"
+            "nopass,,\n"
+        )
+        self.assertIn("Registered 2 campers, skipped 2", output)
+        fresh = User.objects.get(username="fresh")
+        self.assertTrue(fresh.check_password("s3cret-pass"))
+        self.assertEqual(fresh.camper_profile.age, 41)
+        self.assertTrue(Token.objects.filter(user=fresh).exists())
+        nopass = User.objects.get(username="nopass")
+        self.assertFalse(nopass.has_usable_password())
+        self.assertIsNone(nopass.camper_profile.age)
+
+    def test_non_numeric_age(self):
+        with self.assertRaisesMessage(CommandError, "Row 2 has a non-numeric age"):
+            self.import_csv("username,age\nok,20\nbad,twelve\n")
+        self.assertFalse(User.objects.exists())
+
+
+class ImageVariantTests(TestCase):
+    """Originals smaller than the variant widths don't repeat srcset widths."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_small_original(self):
+        buffer = io.BytesIO()
+        PILImage.new("RGB", (600, 400), "green").save(buffer, "JPEG")
+        image = CampsiteImage(campsite=make_campsite(1))
+        image.image_url.save("small.jpg", ContentFile(buffer.getvalue()), save=False)
+
+        variants = generate_variants(image)
+        self.assertEqual(variants["thumb"]["width"], 320)
+        self.assertEqual(variants["card"], variants["full"])
+        self.assertEqual(variants["full"]["width"], 600)
+
+        image.variants = variants
+        urls = variant_urls(image)
+        self.assertEqual(
+            srcset(urls, "webp"),
+            f"{urls['thumb']['webp']} 320w, {urls['card']['webp']} 600w",
+        )
+
+
+def jpeg_bytes(color, size=(600, 400)):
+    buffer = io.BytesIO()
+    PILImage.new("RGB", size, color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class CampsiteImageFileTests(TestCase):
+    """Shared image files and variants are only deleted once unreferenced."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.campsite = make_campsite(1)
+        self.storage = campsite_image_storage
+
+    def no_grace(self):
+        grace = mock.patch.object(self.storage, "release_grace", 0)
+        grace.start()
+        self.addCleanup(grace.stop)
+
+    def upload(self, color, name="photo.jpg"):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = CampsiteImage(campsite=self.campsite)
+            image.image_url.save(name, ContentFile(jpeg_bytes(color)))
+        image.refresh_from_db()
+        return image
+
+    def files(self, image):
+        return {image.image_url.name, *variant_names(image.variants)}
+
+    def assertStored(self, names, stored=True):
+        for name in names:
+            self.assertEqual(self.storage.exists(name), stored, name)
+
+    def test_identical_uploads_share_files_until_both_are_deleted(self):
+        self.no_grace()
+        first = self.upload("red")
+        second = self.upload("red", name="copy.jpg")
+        self.assertEqual(first.image_url.name, second.image_url.name)
+        self.assertEqual(first.variants, second.variants)
+        files = self.files(first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertStored(files)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertStored(files, stored=False)
+
+    def test_replacing_the_file_releases_the_old_one(self):
+        self.no_grace()
+        image = self.upload("red")
+        old_files = self.files(image)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.image_url.save("new.jpg", ContentFile(jpeg_bytes("blue")))
+        image.refresh_from_db()
+        self.assertStored(old_files, stored=False)
+        self.assertStored(self.files(image))
+        self.assertTrue(old_files.isdisjoint(self.files(image)))
+
+    def test_recently_saved_files_survive_release(self):
+        # A concurrent upload of the same bytes refreshes the file's
+        # modification time before committing the row that references it
+        image = self.upload("red")
+        files = self.files(image)
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertStored(files)
+
+        self.no_grace()
+        call_command("dedupe_campsite_images", "--prune", stdout=io.StringIO())
+        self.assertStored(files, stored=False)
+
+    def test_dedupe_keeps_live_variants(self):
+        self.no_grace()
+        legacy = "campsite_images/legacy.jpg"
+        path = Path(self.storage.path(legacy))
+        path.parent.mkdir(parents=True)
+        path.write_bytes(jpeg_bytes("green"))
+        with self.captureOnCommitCallbacks(execute=True):
+            image = CampsiteImage.objects.create(
+                campsite=self.campsite, image_url=legacy
+            )
+        image.refresh_from_db()
+        variants = variant_names(image.variants)
+        self.assertTrue(variants)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedupe_campsite_images", stdout=io.StringIO())
+        image.refresh_from_db()
+        self.assertTrue(self.storage.is_content_name(image.image_url.name))
+        self.assertTrue(has_current_variants(image))
+        self.assertEqual(variant_names(image.variants), variants)
+        self.assertStored([legacy], stored=False)
+        self.assertStored(self.files(image))
+
+
+class MediaTests(TestCase):
+    """serve_media answers conditional and range requests."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        Path(media_root.name, "digits.txt").write_bytes(b"0123456789")
+        Path(media_root.name, "empty.txt").write_bytes(b"")
+        Path(media_root.name, "a b%.txt").write_bytes(b"odd name")
+
+    def get(self, path="digits.txt", **headers):
+        return self.client.get(f"/media/{path}", headers=headers)
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self.body(response), b"0123456789")
+
+    def test_ranges(self):
+        for header, content_range, body in (
+            ("bytes=2-5", "bytes 2-5/10", b"2345"),
+            ("bytes=7-", "bytes 7-9/10", b"789"),
+            ("bytes=-3", "bytes 7-9/10", b"789"),
+            ("bytes=-50", "bytes 0-9/10", b"0123456789"),
+        ):
+            response = self.get(Range=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response["Content-Range"], content_range)
+            self.assertEqual(self.body(response), body)
+
+    def test_unsatisfiable_ranges(self):
+        for path, header, size in (
+            ("digits.txt", "bytes=10-", 10),
+            ("digits.txt", "bytes=-0", 10),
+            ("empty.txt", "bytes=-5", 0),
+            ("empty.txt", "bytes=0-", 0),
+        ):
+            response = self.get(path, Range=header)
+            self.assertEqual(response.status_code, 416, (path, header))
+            self.assertEqual(response["Content-Range"], f"bytes */{size}")
+
+    def test_conditional_requests(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(If_None_Match=etag).status_code, 304)
+        # A stale If-Range gets the whole, current file
+        response = self.get(Range="bytes=0-1", If_Range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response = self.get(Range="bytes=0-1", If_Range=etag)
+        self.assertEqual(response.status_code, 206)
+
+    @override_settings(MEDIA_OFFLOAD="x-accel-redirect")
+    def test_offload_path_is_quoted(self):
+        response = self.get("a%20b%25.txt")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/a%20b%25.txt")
+
+
+class DailyOccupancyTests(TestCase):
+    """The rollup keeps every night of overlapping reservations."""
+
+    def test_overlapping_reservations_keep_their_nights(self):
+        campsite = make_campsite(1)
+        camper = make_camper("overlap")
+        stays = [
+            (date(2030, 7, 1), date(2030, 7, 4)),
+            (date(2030, 7, 3), date(2030, 7, 5)),
+        ]
+        for check_in, check_out in stays:
+            Reservation.objects.create(
+                camper=camper,
+                campsite=campsite,
+                check_in_date=check_in,
+                check_out_date=check_out,
+                number_of_guests=2,
+            )
+
+        self.assertEqual(DailyOccupancy.objects.count(), 5)
+        self.assertEqual(DailyOccupancy.objects.rebuild(), 5)
+        self.assertEqual(
+            DailyOccupancy.objects.aggregate(total=Sum("revenue"))["total"],
+            Decimal("200.00"),
+        )
+
+
+class ReportRangeTests(TestCase):
+    """Report ranges are validated and capped before anything is built."""
+
+    def setUp(self):
+        admin = User.objects.create_user("admin", password="password", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def test_bad_ranges(self):
+        for report in ("sales", "reservations"):
+            for params in (
+                {"year": "99999999999"},
+                {"year": "abc"},
+                {"start": "2030-02-01", "end": "2030-01-01"},
+                {"start": "0001-01-01", "end": "9999-12-31"},
+            ):
+                response = self.client.get(f"/api/reports/{report}", params)
+                self.assertEqual(response.status_code, 400, (report, params))
+
+    def test_year(self):
+        response = self.client.get("/api/reports/reservations", {"year": "2030"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 12)
+
+
+@override_settings(PASSWORD_HASHING_WORKERS=0)
+class ConcurrentReservationTests(TransactionTestCase):
+    """Simultaneous bookings of the same nights yield exactly one reservation."""
+
+    def test_concurrent_reserve(self):
+        campsite = make_campsite(1)
+        campers = [make_camper(f"racer{i}") for i in range(8)]
+        barrier = threading.Barrier(len(campers))
+        statuses = []
+
+        def reserve(camper):
+            client = APIClient()
+            client.force_authenticate(camper.user)
+            try:
+                barrier.wait()
+                response = client.post(
+                    f"/api/campsites/{campsite.pk}/reserve",
+                    {
+                        "check_in_date": "2030-07-01",
+                        "check_out_date": "2030-07-04",
+                        "number_of_guests": 2,
+                    },
+                    format="json",
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=reserve, args=(c,)) for c in campers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(409), len(campers) - 1, statuses)
+        self.assertEqual(Reservation.objects.filter(campsite=campsite).count(), 1)
+        self.assertEqual(
+            DailyOccupancy.objects.filter(campsite=campsite).count(), 3
+        )
@@ -4,6 +4,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from api import async_views
 from api.views.report_viewset import ReportViewSet
 
 from .views import (
@@ -20,6 +21,14 @@ router.register(r"campsites", CampsiteViewSet, basename="campsite")
 router.register(r"reports", ReportViewSet, basename="report")
 
 urlpatterns = [
+    path("async/campsites", async_views.campsite_list),
+    path("async/campsites/<int:pk>", async_views.campsite_detail),
+    path(
+        "async/campsites/<int:pk>/availability", async_views.campsite_availability
+    ),
+    path("async/auth/profile", async_views.profile),
+    path("async/auth/login", async_views.login),
+    path("async/auth/register", async_views.register),
     path("", include(router.urls)),
 ]
 
@@ -6,10 +6,51 @@ from rest_framework.permissions import AllowAny
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate, login as auth_login
+from django.db import IntegrityError, transaction
 from rest_framework import status
+from api import hashing
 import json
 
 
+class UsernameTaken(Exception):
+    """Raised by create_account when the username is already registered."""
+
+
+def create_account(req_body, password):
+    """
+    Create a user with the already hashed ``password``, their camper
+    profile and token together. Returns (user, token). The unique username
+    constraint rejects duplicates, so there's no pre-check; an
+    IntegrityError only becomes UsernameTaken if that username exists.
+    """
+    username = User.normalize_username(req_body["username"])
+    try:
+        with transaction.atomic():
+            return _create_account(username, req_body, password)
+    except IntegrityError:
+        if User.objects.filter(username=username).exists():
+            raise UsernameTaken(username) from None
+        raise
+
+
+def _create_account(username, req_body, password):
+    new_user = User.objects.create(
+        username=username,
+        email=User.objects.normalize_email(req_body["email"]),
+        password=password,
+        first_name=req_body["first_name"],
+        last_name=req_body["last_name"],
+    )
+    Camper.objects.create(
+        user=new_user,
+        age=req_body.get("age"),
+        phone_number=req_body.get("phone_number"),
+    )
+    # Use the REST Framework's token generator on the new user account
+    token = Token.objects.create(user=new_user)
+    return new_user, token
+
+
 class AuthViewSet(ViewSet):
     """ViewSet for handling authentication (login and register)."""
 
@@ -26,23 +67,18 @@ class AuthViewSet(ViewSet):
                 {"error": "Username and password are required."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        try:
-            user = User.objects.get(username=username)
-        except User.DoesNotExist:
-            return Response(
-                {"error": "Invalid credentials."},
-                status=status.HTTP_401_UNAUTHORIZED,
-            )
-        authenticated_user = authenticate(username=username, password=password)
+        # HashingPoolBackend checks the password in the hashing pool, so
+        # this worker stays free for other requests meanwhile
+        user = authenticate(request, username=username, password=password)
 
-        if authenticated_user is not None:
-            token, _ = Token.objects.get_or_create(user=authenticated_user)
-            auth_login(request, authenticated_user)
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            auth_login(request, user)
             return Response(
                 {
                     "valid": True,
                     "token": token.key,
-                    "id": authenticated_user.id,
+                    "id": user.id,
                 },
                 status=status.HTTP_200_OK,
             )
@@ -57,38 +93,20 @@ class AuthViewSet(ViewSet):
         # Load the JSON string of the request body into a dict
         req_body = request.data
 
-        # Create a new user by invoking the `create_user` helper method
-        # on Django's built-in User model
-        if User.objects.filter(username=req_body["username"]).exists():
+        # Hash before opening the transaction so no locks are held while
+        # the hashing pool works
+        password = hashing.make_password(req_body["password"])
+
+        try:
+            new_user, token = create_account(req_body, password)
+        except UsernameTaken:
             return Response(
                 {"error": "Username already exists"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        new_user = User.objects.create_user(
-            username=req_body["username"],
-            email=req_body["email"],
-            password=req_body["password"],
-            first_name=req_body["first_name"],
-            last_name=req_body["last_name"],
-        )
-        new_user.save()
-
-        camper = Camper.objects.create(
-            user=new_user,
-            age=req_body.get("age"),
-            phone_number=req_body.get("phone_number"),
-        )  # Assuming Camper has a OneToOneField with User
-
-        # Commit the user to the database by saving it
-        camper.save()
-
-        # Use the REST Framework's token generator on the new user account
-        token = Token.objects.create(user=new_user)
-        token.save()
 
         # Return the token to the client
         data = {"token": token.key, "id": new_user.id}
         return Response(
             data, status=status.HTTP_201_CREATED
         )
-
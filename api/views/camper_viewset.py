@@ -11,18 +11,24 @@ Date: [2025-04-24]
 """
 
 from inspect import stack
-from datetime import datetime
+from datetime import date, datetime
 from rest_framework import status
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
 
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from api.authentication import CachedTokenAuthentication, request_camper
+from api.filters import bool_param
 from api.models.camper import PaymentMethod
+from api.pagination import ReservationCursorPagination
 from api.serializers import CamperProfileSerializer
-from api.models import Camper, Reservation
+from api.serializers.camper_serializers import (
+    ReservationSerializer,
+    reservations_for_serializer,
+)
+from api.models import Reservation
 
 
 def convert_expiration_date(mm_yy):
@@ -41,7 +47,7 @@ class CamperProfileViewSet(ViewSet):
     """ViewSet for managing camper profiles."""
 
     serializer_class = CamperProfileSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def list(self, request):
@@ -53,7 +59,7 @@ class CamperProfileViewSet(ViewSet):
                 },
                 status=status.HTTP_200_OK,
             )
-        camper = Camper.objects.filter(user=request.auth.user).first()
+        camper = request_camper(request)
         if camper:
             serialized_camper = self.serializer_class(
                 camper, many=False, context={"request": request}
@@ -69,9 +75,8 @@ class CamperProfileViewSet(ViewSet):
 
     def update(self, request, pk=None):
         """Handle PUT requests to update an existing camper profile."""
-        try:
-            camper = Camper.objects.get(user=request.auth.user)
-        except Camper.DoesNotExist:
+        camper = request_camper(request)
+        if camper is None:
             return Response(
                 {"message": "Camper profile not found."},
                 status=status.HTTP_404_NOT_FOUND,
@@ -93,9 +98,8 @@ class CamperProfileViewSet(ViewSet):
 
     def destroy(self, request):
         """Handle DELETE requests to delete a camper profile."""
-        try:
-            camper = Camper.objects.get(user=request.auth.user)
-        except Camper.DoesNotExist:
+        camper = request_camper(request)
+        if camper is None:
             return Response(
                 {"message": "Camper profile not found."},
                 status=status.HTTP_404_NOT_FOUND,
@@ -113,6 +117,55 @@ class CamperProfileViewSet(ViewSet):
             status=status.HTTP_204_NO_CONTENT,
         )
 
+    @action(detail=False, methods=["get"], url_path="reservations")
+    def reservations(self, request):
+        """
+        The camper's reservation history, one cursor page at a time.
+
+        Filters:
+        - status: only reservations with this status
+        - upcoming=true: stays checking in today or later, soonest first
+        - past=true: stays that have already checked out
+        Add expand=campsite for full campsite details.
+        """
+        if request.user.is_anonymous:
+            return Response(
+                {"message": "Log in to view your reservations."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        camper = request_camper(request)
+        if camper is None:
+            return Response(
+                {"message": "Camper profile not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        try:
+            upcoming = bool_param(request.query_params, "upcoming")
+            past = bool_param(request.query_params, "past")
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        reservations = Reservation.objects.filter(camper=camper)
+        reservation_status = request.query_params.get("status")
+        if reservation_status:
+            reservations = reservations.filter(status=reservation_status)
+
+        paginator = ReservationCursorPagination()
+        today = date.today()
+        if upcoming:
+            reservations = reservations.filter(check_in_date__gte=today)
+            paginator.ordering = "check_in_date"
+        if past:
+            reservations = reservations.filter(check_out_date__lt=today)
+
+        context = {"request": request}
+        page = paginator.paginate_queryset(
+            reservations_for_serializer(reservations, context), request
+        )
+        serializer = ReservationSerializer(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=["post"], url_path="addpaymentmethod")
     def add_payment_method(self, request):
         """
@@ -129,9 +182,8 @@ class CamperProfileViewSet(ViewSet):
         }
         """
         # Get the Camper instance associated with the logged-in user.
-        try:
-            camper = Camper.objects.get(user=request.auth.user)
-        except Camper.DoesNotExist:
+        camper = request_camper(request)
+        if camper is None:
             return Response(
                 {"detail": "Camper not found for the current user."},
                 status=status.HTTP_404_NOT_FOUND,
@@ -203,9 +255,8 @@ class CamperProfileViewSet(ViewSet):
             "payment_method_id": 123
         }
         """
-        try:
-            camper = Camper.objects.get(user=request.auth.user)
-        except Camper.DoesNotExist:
+        camper = request_camper(request)
+        if camper is None:
             return Response(
                 {"detail": "Camper not found for the current user."},
                 status=status.HTTP_404_NOT_FOUND,
@@ -261,9 +312,8 @@ class CamperProfileViewSet(ViewSet):
                 )
 
                 # Get the current user's camper profile
-            try:
-                camper = Camper.objects.get(user=request.user)
-            except Camper.DoesNotExist:
+            camper = request_camper(request)
+            if camper is None:
                 return Response(
                     {"error": "Camper profile not found"},
                     status=status.HTTP_404_NOT_FOUND,
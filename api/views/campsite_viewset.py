@@ -1,36 +1,110 @@
 from rest_framework.viewsets import ViewSet
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.filters import OrderingFilter
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from api.models import Campsite, Reservation, Camper
+from api.models import Campsite, Reservation, Camper, Review
 from rest_framework import status
-from datetime import date, timedelta
-from calendar import monthrange
+from datetime import date
 
-from api.serializers import CampsiteSerializer
+from api.authentication import request_camper
+from api.availability import (
+    availability_calendar,
+    available_campsites,
+    parse_calendar_range,
+)
+from api.cache import cached_response, campsite_key, catalog_key
+from api.filters import amenity_facets, filter_campsites
+from api.pagination import CampsiteCursorPagination, ReviewCursorPagination
+from api.serializers import CampsiteSerializer, ReviewSerializer
 from api.serializers.camper_serializers import ReservationSerializer
 
 
+def parse_csv_param(request, name):
+    """Split a comma separated query parameter into a list, or None if absent."""
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
 class CampsiteViewSet(ViewSet):
+    # Read by the cursor paginator to order campsite pages
+    filter_backends = [OrderingFilter]
+    ordering_fields = [
+        "id",
+        "site_number",
+        "price_per_night",
+        "max_occupancy",
+        "rating_avg",
+        "rating_count",
+    ]
+    ordering = "id"
 
     def list(self, request):
         """
-        List all campsites
+        List campsites, one cursor page at a time.
+
+        Supports sparse fieldsets, e.g. a summary card view with
+        ``?fields=id,site_number,price_per_night,thumbnail&expand=amenities``,
+        ordering (``?ordering=-rating_avg``) and the filters in api/filters.py:
+        amenities, amenities_any, min_price, max_price, guests, available,
+        min_rating, bbox and near/radius_km.
+        Reviews are left out unless requested with ``expand=reviews``.
+        """
+        try:
+            campsites = filter_campsites(Campsite.objects.all(), request.query_params)
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return cached_response(
+            request,
+            catalog_key(request),
+            lambda: self.paginated_response(request, campsites).data,
+        )
+
+    def paginated_response(self, request, campsites):
+        """
+        Serialize one cursor page of campsites honouring fields/expand,
+        with amenity facet counts over the whole filtered set.
         """
-        campsites = Campsite.objects.all()
+        fields = parse_csv_param(request, "fields")
+        expand = parse_csv_param(request, "expand")
+        if fields is None:
+            # Rating aggregates summarise the reviews on list pages
+            fields = [
+                name for name in CampsiteSerializer.Meta.fields if name != "reviews"
+            ]
+        selected = CampsiteSerializer.select_fields(fields, expand)
+
+        campsites = campsites.with_details(
+            amenities=selected is None or "amenities" in selected,
+            reviews=selected is None or "reviews" in selected,
+        )
+        paginator = CampsiteCursorPagination()
+        page = paginator.paginate_queryset(campsites, request, view=self)
         serializer = CampsiteSerializer(
-            campsites, many=True, context={"request": request}
+            page,
+            many=True,
+            context={"request": request},
+            fields=fields,
+            expand=expand,
         )
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        response = paginator.get_paginated_response(serializer.data)
+        response.data["facets"] = {"amenities": amenity_facets(campsites)}
+        return response
 
     def retrieve(self, request, pk=None):
         """
         Retrieve a campsite by ID
         """
+        def build():
+            campsite = Campsite.objects.with_details().get(pk=pk)
+            return CampsiteSerializer(campsite, context={"request": request}).data
+
         try:
-            campsite = Campsite.objects.get(pk=pk)
-            serializer = CampsiteSerializer(campsite, context={"request": request})
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return cached_response(request, campsite_key(request, pk), build)
         except Campsite.DoesNotExist:
             return Response(
                 {"message": "Campsite not found"}, status=status.HTTP_404_NOT_FOUND
@@ -46,59 +120,78 @@ class CampsiteViewSet(ViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=["get"], url_path="available")
+    def available(self, request):
+        """
+        Campsites free for a whole stay, e.g.
+        ``?check_in=2025-07-01&check_out=2025-07-04&guests=4``.
+        Paginated like the campsite list and supports fields/expand.
+        """
+        try:
+            check_in_date = date.fromisoformat(request.query_params.get("check_in", ""))
+            check_out_date = date.fromisoformat(
+                request.query_params.get("check_out", "")
+            )
+        except ValueError:
+            return Response(
+                {"message": "check_in and check_out are required as YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            guests = int(request.query_params.get("guests", 1))
+        except ValueError:
+            return Response(
+                {"message": "Invalid number of guests"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if check_in_date >= check_out_date:
+            return Response(
+                {"message": "Check-in date must be before check-out date"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        campsites = available_campsites(check_in_date, check_out_date, guests)
+        try:
+            campsites = filter_campsites(campsites, request.query_params)
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.paginated_response(request, campsites)
+
     @action(detail=True, methods=["get"], url_path="availability")
     def availability(self, request, pk=None):
+        """
+        Day-by-day availability for a campsite.
+
+        Accepts either ``month``/``year`` (defaulting to the current month) or
+        an inclusive ``start``/``end`` ISO date range of up to a year, so a
+        full calendar can be fetched in one request.
+        """
         # Get the campsite object
         campsite = get_object_or_404(Campsite, id=pk)
-
-        # Get query parameters for month and year
         today = date.today()
-        month = int(request.query_params.get("month", today.month))
-        year = int(request.query_params.get("year", today.year))
-
-        # Calculate start and end dates for the requested month
-        start_date = date(year, month, 1)
-        _, days_in_month = monthrange(year, month)
-        end_date = start_date + timedelta(days=days_in_month)
-
-        # Get all reservations for the campsite in the date range
-        reservations = Reservation.objects.filter(
-            campsite=campsite,
-            check_in_date__lt=end_date,
-            check_out_date__gte=start_date,
-        )
 
-        # Create a set of all reserved dates
-        reserved_dates = set()
-        for reservation in reservations:
-            current_date = reservation.check_in_date
-            while current_date <= reservation.check_out_date:
-                reserved_dates.add(current_date)
-                current_date += timedelta(days=1)
-
-        # Create a list of all dates in the range with their availability
-        all_dates = []
-
-        current_date = start_date
-        while current_date < end_date:
-            all_dates.append(
-                {
-                    "date": current_date,
-                    "day": current_date.strftime("%A"),
-                    "month": current_date.strftime("%B"),
-                    "year": current_date.year,
-                    "day_number": current_date.day,
-                    "month_number": current_date.month,
-                    "year_number": current_date.year,
-                    "available": current_date >= today
-                    and current_date not in reserved_dates,
-                }
-            )
-            current_date += timedelta(days=1)
+        try:
+            start_date, end_date = parse_calendar_range(request.query_params, today)
+        except ValueError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Return the available dates as a JSON response
+        all_dates = availability_calendar(campsite, start_date, end_date, today)
         return Response(all_dates, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=["get"], url_path="reviews")
+    def reviews(self, request, pk=None):
+        """Reviews for a campsite, newest first, one cursor page at a time."""
+        campsite = get_object_or_404(Campsite, id=pk)
+        reviews = Review.objects.filter(campground=campsite).select_related(
+            "camper__user"
+        )
+        # No view is passed so the campsite ordering options don't apply here
+        paginator = ReviewCursorPagination()
+        page = paginator.paginate_queryset(reviews, request)
+        serializer = ReviewSerializer(page, many=True, context={"request": request})
+        return paginator.get_paginated_response(serializer.data)
+
     @action(detail=True, methods=["post"], url_path="reserve")
     def reserve(self, request, pk=None):
         """Reservation for campsite"""
@@ -145,7 +238,9 @@ class CampsiteViewSet(ViewSet):
 
         try:
             campsite = get_object_or_404(Campsite, id=pk)
-            camper = Camper.objects.get(user=request.auth.user)
+            camper = request_camper(request)
+            if camper is None:
+                raise Camper.DoesNotExist
         except Campsite.DoesNotExist:
             return Response(
                 {"message": "Campsite not found"}, status=status.HTTP_404_NOT_FOUND
@@ -161,15 +256,36 @@ class CampsiteViewSet(ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            reservation = Reservation(
-                campsite=campsite,
-                camper=camper,
-                check_in_date=check_in_date,
-                check_out_date=check_out_date,
-                number_of_guests=number_of_guests,
+        if number_of_guests > campsite.max_occupancy:
+            return Response(
+                {"message": "Number of guests exceeds campsite occupancy"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            reservation.save()
+
+        try:
+            with transaction.atomic():
+                # Lock the campsite row so concurrent bookings for the same
+                # site queue behind this one instead of racing the overlap
+                # check below.
+                campsite = Campsite.objects.select_for_update().get(pk=campsite.pk)
+                if (
+                    Reservation.objects.overlapping(check_in_date, check_out_date)
+                    .filter(campsite=campsite)
+                    .exists()
+                ):
+                    return Response(
+                        {"message": "Campsite is already booked for those dates"},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+
+                reservation = Reservation(
+                    campsite=campsite,
+                    camper=camper,
+                    check_in_date=check_in_date,
+                    check_out_date=check_out_date,
+                    number_of_guests=number_of_guests,
+                )
+                reservation.save()
 
             serialized_res = ReservationSerializer(
                 reservation, context={"request": request}
@@ -4,12 +4,83 @@ from rest_framework.permissions import IsAdminUser
 from rest_framework.views import Response
 from rest_framework.viewsets import ViewSet
 from rest_framework import serializers
+from api.models import Campsite, DailyOccupancy
 from api.models.reservation import Reservation
-from django.db.models import Count
-from django.db.models.functions import ExtractMonth
+from api.pagination import ReservationCursorPagination
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from calendar import monthrange
 from collections import defaultdict
+from decimal import Decimal
 import datetime
 
+SALES_PERIODS = {
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+
+# Longest range a single report covers, about ten years
+MAX_REPORT_DAYS = 3660
+
+
+def parse_report_range(request):
+    """
+    Read the inclusive ``start``/``end`` ISO dates of a report. A ``year``
+    parameter selects that whole calendar year instead; with neither the
+    current year is used. Raises ValueError on malformed input or a range
+    longer than MAX_REPORT_DAYS.
+    """
+    today = datetime.date.today()
+    start = request.query_params.get("start")
+    end = request.query_params.get("end")
+    year = request.query_params.get("year")
+    try:
+        if year and not (start or end):
+            start_date = datetime.date(int(year), 1, 1)
+            end_date = datetime.date(int(year), 12, 31)
+        else:
+            start_date = (
+                datetime.date.fromisoformat(start)
+                if start
+                else datetime.date(today.year, 1, 1)
+            )
+            end_date = (
+                datetime.date.fromisoformat(end)
+                if end
+                else datetime.date(start_date.year, 12, 31)
+            )
+    except (ValueError, OverflowError):
+        raise ValueError("Use start/end as YYYY-MM-DD or a numeric year.")
+    if start_date > end_date:
+        raise ValueError("start must not be after end.")
+    if (end_date - start_date).days + 1 > MAX_REPORT_DAYS:
+        raise ValueError(f"Reports cover at most {MAX_REPORT_DAYS} days.")
+    return start_date, end_date
+
+
+def period_length(group_by, period_start):
+    """Number of days in the reporting period starting at period_start."""
+    if group_by == "day":
+        return 1
+    if group_by == "week":
+        return 7
+    return monthrange(period_start.year, period_start.month)[1]
+
+
+def sales_figures(revenue, nights, reservations, available_nights):
+    """Build one row of sales figures from aggregated totals."""
+    revenue = revenue or Decimal("0.00")
+    nights = nights or 0
+    return {
+        "revenue": revenue,
+        "nights_sold": nights,
+        "reservations": reservations,
+        "occupancy_rate": round(nights / available_nights, 4) if available_nights else 0,
+        "average_daily_rate": round(revenue / nights, 2) if nights else Decimal("0.00"),
+    }
+
 class ReservationReportSerializer(serializers.ModelSerializer):
     """serializer for reservation report"""
     duration = serializers.SerializerMethodField()
@@ -39,51 +110,175 @@ class ReportViewSet(ViewSet):
     permission_classes = [IsAdminUser]
     """Viewset for report data"""
     def list(self,request):
-        """reports top level"""
-        all_reservations = Reservation.objects.all()
-        reservations = ReservationReportSerializer(all_reservations,  many=True, context={"request": request})
+        """reports top level, with one cursor page of reservations"""
+        paginator = ReservationCursorPagination()
+        page = paginator.paginate_queryset(Reservation.objects.all(), request, view=self)
+        reservations = ReservationReportSerializer(page,  many=True, context={"request": request})
 
         return Response({
                 "links": [
             { "endpoint": "admin/report/sales", "name": "Sales Report" },
             { "endpoint": "admin/analytics/reservations", "name": "Reservation Analytics" },
         ],
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
             "reservations": reservations.data
         },
                         status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"], url_path="sales")
-    def sales_report(self, request ):
-        """handles sales report data"""
-        return Response("hi",status=status.HTTP_200_OK)
+    def sales_report(self, request):
+        """
+        Revenue, nights sold, occupancy rate and average daily rate for the
+        nights between ``start`` and ``end``.
+
+        ``group_by`` is one of day, week, month (default) or campsite.
+        Everything is aggregated in the database from the DailyOccupancy
+        rollup, so each night's revenue lands in the period it was stayed.
+        """
+        group_by = request.query_params.get("group_by", "month")
+        if group_by not in SALES_PERIODS and group_by != "campsite":
+            return Response(
+                {"error": "group_by must be one of day, week, month, campsite."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            start_date, end_date = parse_report_range(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        nights = DailyOccupancy.objects.filter(
+            booked=True, date__gte=start_date, date__lte=end_date
+        )
+        totals = {
+            "revenue": Sum("revenue"),
+            "nights": Count("id"),
+            "reservations": Count("reservation", distinct=True),
+        }
+        range_days = (end_date - start_date).days + 1
+        site_count = Campsite.objects.count()
+
+        results = []
+        if group_by == "campsite":
+            rows = (
+                nights.values("campsite", "campsite__site_number")
+                .annotate(**totals)
+                .order_by("campsite__site_number")
+            )
+            for row in rows:
+                results.append(
+                    {
+                        "campsite": row["campsite"],
+                        "site_number": row["campsite__site_number"],
+                        **sales_figures(
+                            row["revenue"],
+                            row["nights"],
+                            row["reservations"],
+                            range_days,
+                        ),
+                    }
+                )
+        else:
+            rows = (
+                nights.annotate(period=SALES_PERIODS[group_by]("date"))
+                .values("period")
+                .annotate(**totals)
+                .order_by("period")
+            )
+            for row in rows:
+                period_start = max(row["period"], start_date)
+                period_end = min(
+                    row["period"]
+                    + datetime.timedelta(days=period_length(group_by, row["period"]) - 1),
+                    end_date,
+                )
+                period_days = (period_end - period_start).days + 1
+                results.append(
+                    {
+                        "period": row["period"],
+                        **sales_figures(
+                            row["revenue"],
+                            row["nights"],
+                            row["reservations"],
+                            site_count * period_days,
+                        ),
+                    }
+                )
+
+        overall = nights.aggregate(**totals)
+        return Response(
+            {
+                "start": start_date,
+                "end": end_date,
+                "group_by": group_by,
+                "totals": sales_figures(
+                    overall["revenue"],
+                    overall["nights"],
+                    overall["reservations"],
+                    site_count * range_days,
+                ),
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
 
     @action(detail=False, methods=["get"], url_path="reservations")
     def reservation_report(self, request):
-        """handles reservation report data"""
-        # Get reservations grouped by month
-        reservations_by_month = Reservation.objects.annotate(
-            month=ExtractMonth('check_in_date')
-        ).values('month').annotate(
-            count=Count('id')
-        ).order_by('month')
-        
-        # Create a dictionary with all months initialized to 0
+        """
+        Reservations per (year, month) for stays checking in between
+        ``start`` and ``end`` (or within ``year``), optionally broken down
+        by ``group_by`` = status or campsite.
+        """
+        group_by = request.query_params.get("group_by")
+        if group_by not in (None, "status", "campsite"):
+            return Response(
+                {"error": "group_by must be status or campsite."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            start_date, end_date = parse_report_range(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Get reservations grouped by month, only touching the requested range
+        group_fields = ["period"] + ([group_by] if group_by else [])
+        reservations_by_month = (
+            Reservation.objects.filter(
+                check_in_date__gte=start_date, check_in_date__lte=end_date
+            )
+            .annotate(period=TruncMonth("check_in_date"))
+            .values(*group_fields)
+            .annotate(count=Count("id"))
+            .order_by(*group_fields)
+        )
+
+        # Create dictionaries with all months initialized to 0
         month_data = defaultdict(int)
+        breakdown = defaultdict(dict)
         for item in reservations_by_month:
-            month_data[item['month']] = item['count']
-        
+            key = (item["period"].year, item["period"].month)
+            month_data[key] += item["count"]
+            if group_by:
+                breakdown[key][str(item[group_by])] = item["count"]
+
         # Month name mapping
         month_names = {
             1: 'Jan', 2: 'Feb', 3: 'Mar', 4: 'Apr', 5: 'May', 6: 'June',
             7: 'July', 8: 'Aug', 9: 'Sept', 10: 'Oct', 11: 'Nov', 12: 'Dec'
         }
-        
-        # Format the result
+
+        # Format the result, one entry per month in the range
         result = []
-        for month_num in range(1, 13):
-            result.append({
-                'month': month_names[month_num],
-                'reservations': month_data[month_num]
-            })
-        
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            entry = {
+                "year": year,
+                "month": month_names[month],
+                "reservations": month_data[(year, month)],
+            }
+            if group_by:
+                entry[group_by] = breakdown[(year, month)]
+            result.append(entry)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
         return Response(result, status=status.HTTP_200_OK)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from decouple import config
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -47,7 +49,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",  # Use token-based auth
+        "api.authentication.CachedTokenAuthentication",  # Use token-based auth
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",  # Allow unauthenticated access
@@ -92,13 +94,100 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE picks a profile: "sqlite" (default) or "postgresql".
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse. On PostgreSQL, DB_POOL=True uses psycopg's connection pool
+# instead (install the `postgres` extra), which replaces persistent
+# connections, so CONN_MAX_AGE must be 0 with it. Under ASGI, set
+# DB_CONN_MAX_AGE=0 or use the pool, as persistent connections aren't
+# reused across async requests.
+
+DB_ENGINE = config("DB_ENGINE", default="sqlite")
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config("DB_CONN_HEALTH_CHECKS", default=True, cast=bool)
+
+if DB_ENGINE == "postgresql":
+    DB_POOL = config("DB_POOL", default=False, cast=bool)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config("DB_NAME", default="tides_end"),
+            'USER': config("DB_USER", default=""),
+            'PASSWORD': config("DB_PASSWORD", default=""),
+            'HOST': config("DB_HOST", default=""),
+            'PORT': config("DB_PORT", default=""),
+            'CONN_MAX_AGE': 0 if DB_POOL else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': config("DB_POOL_MIN_SIZE", default=2, cast=int),
+                    'max_size': config("DB_POOL_MAX_SIZE", default=10, cast=int),
+                    'timeout': config("DB_POOL_TIMEOUT", default=10, cast=int),
+                },
+            } if DB_POOL else {},
+        }
+    }
+elif DB_ENGINE == "sqlite":
+    # WAL lets readers carry on while a booking writes, and IMMEDIATE
+    # transactions take the write lock up front, so concurrent bookings
+    # wait on busy_timeout instead of failing with "database is locked".
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config("DB_NAME", default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            'OPTIONS': {
+                'init_command': (
+                    "PRAGMA journal_mode=WAL;"
+                    "PRAGMA synchronous=NORMAL;"
+                    f"PRAGMA busy_timeout={config('DB_BUSY_TIMEOUT', default=5000, cast=int)};"
+                    f"PRAGMA mmap_size={config('DB_MMAP_SIZE', default=134217728, cast=int)};"
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            },
+            # A file rather than the in-memory default, so tests see the same
+            # WAL locking and busy_timeout waits as a running server.
+            'TEST': {
+                'NAME': config("DB_TEST_NAME", default=str(BASE_DIR / 'test_db.sqlite3')),
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        f"DB_ENGINE must be 'sqlite' or 'postgresql', not {DB_ENGINE!r}."
+    )
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default, which is only correct with a single process:
+# cached campsite payloads are invalidated by bumping version keys in the
+# cache (api/cache.py), and a bump in one worker's local memory never
+# reaches the others, which keep serving their old payloads. Any
+# multi-process deployment (several gunicorn/uvicorn workers or hosts)
+# must use a shared backend, e.g. CACHE_BACKEND
+# django.core.cache.backends.redis.RedisCache with CACHE_LOCATION set to
+# a redis:// URL.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config(
+            "CACHE_BACKEND", default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config("CACHE_LOCATION", default='tides-end'),
     }
 }
 
+# Seconds a serialized campsite payload stays cached
+CAMPSITE_CACHE_TIMEOUT = config("CAMPSITE_CACHE_TIMEOUT", default=300, cast=int)
+
+# Token authentication cache: seconds in the shared cache, seconds and
+# entries in each process's local LRU
+TOKEN_CACHE_TTL = config("TOKEN_CACHE_TTL", default=300, cast=int)
+TOKEN_CACHE_LOCAL_TTL = config("TOKEN_CACHE_LOCAL_TTL", default=5, cast=int)
+TOKEN_CACHE_SIZE = config("TOKEN_CACHE_SIZE", default=1024, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -118,6 +207,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing. PASSWORD_HASHER picks the hasher new hashes use; hashes
+# stored with any other listed hasher (or a different PBKDF2 iteration
+# count) still verify and are upgraded on the user's next login.
+PASSWORD_PBKDF2_ITERATIONS = config(
+    "PASSWORD_PBKDF2_ITERATIONS", default=1_000_000, cast=int
+)
+PASSWORD_HASHER = config("PASSWORD_HASHER", default='api.hashing.TunedPBKDF2PasswordHasher')
+PASSWORD_HASHERS = [PASSWORD_HASHER] + [
+    hasher
+    for hasher in [
+        'api.hashing.TunedPBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ]
+    if hasher != PASSWORD_HASHER
+]
+
+# Processes that hash passwords for login and registration (0 hashes inline)
+PASSWORD_HASHING_WORKERS = config("PASSWORD_HASHING_WORKERS", default=2, cast=int)
+
+# Checks login passwords in the hashing pool above
+AUTHENTICATION_BACKENDS = ['api.backends.HashingPoolBackend']
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -140,6 +254,15 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "media/"
 
+# Media delivery (see api/media.py). Content-addressed files are cached
+# forever; anything else for MEDIA_CACHE_MAX_AGE seconds. Set MEDIA_OFFLOAD
+# to "x-accel-redirect" (nginx, with an internal location at
+# MEDIA_OFFLOAD_PREFIX aliased to MEDIA_ROOT) or "x-sendfile" (Apache,
+# lighttpd) to let the proxy send the file bytes.
+MEDIA_CACHE_MAX_AGE = config("MEDIA_CACHE_MAX_AGE", default=3600, cast=int)
+MEDIA_OFFLOAD = config("MEDIA_OFFLOAD", default="")
+MEDIA_OFFLOAD_PREFIX = config("MEDIA_OFFLOAD_PREFIX", default="/protected-media/")
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field